@@ -5,6 +5,7 @@ from flask import Flask, jsonify, request
 from os import getenv
 from models import storage
 from flask_cors import CORS
+from api.v1.compress import negotiate
 from api.v1.views import app_views
 from models.state import State
 from datetime import datetime, timedelta
@@ -13,6 +14,19 @@ app = Flask(__name__)
 CORS(app, resources={r"/api/v1/*": {"origins": "0.0.0.0"}})
 app.register_blueprint(app_views, url_prefix="/api/v1")
 
+# compression level of the responses, 0 to send them uncompressed
+compress_level = int(getenv("HBNB_API_COMPRESS_LEVEL", "6"))
+# bytes under which a response body is sent uncompressed
+compress_min_size = int(getenv("HBNB_API_COMPRESS_MIN_SIZE", "1024"))
+
+
+@app.after_request
+def compress_response(response):
+    """Compresses the response with an encoding the client accepts"""
+    if not compress_level:
+        return response
+    return negotiate(request, response, compress_level, compress_min_size)
+
 
 @app.teardown_appcontext
 def teardown_appcontext(exception):
@@ -28,13 +42,15 @@ def get_status():
 @app.route('/stats', methods=['GET'])
 def get_stats():
     """Get statistics about the number of objects by type"""
+    counts = storage.count_many(["Amenity", "City", "Place", "Review",
+                                 "State", "User"])
     stats = {
-        "amenities": storage.count("Amenity"),
-        "cities": storage.count("City"),
-        "places": storage.count("Place"),
-        "reviews": storage.count("Review"),
-        "states": storage.count("State"),
-        "users": storage.count("User")
+        "amenities": counts["Amenity"],
+        "cities": counts["City"],
+        "places": counts["Place"],
+        "reviews": counts["Review"],
+        "states": counts["State"],
+        "users": counts["User"]
     }
     return jsonify(stats)
 
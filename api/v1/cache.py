@@ -0,0 +1,162 @@
+#!/usr/bin/python3
+"""
+Contains the ResponseCache class, an LRU cache of API responses that the
+writes to the storage invalidate
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class ResponseCache:
+    """
+    Least recently used cache of response bodies, bounded in bytes, whose
+    entries expire after a time to live.
+
+    Every entry is filed under the tags of what it was built from: "State"
+    for all the State objects, "State:<id>" for one of them and
+    "City:state_id:<id>" for the cities of a State. A write to an object
+    drops the entries tagged with its class, its own id and the parents
+    its foreign keys pointed to before and after the write.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        """
+        Instantiate an empty cache.
+
+        Args:
+            max_bytes (int): The total size of the cached bodies; 0
+                disables the cache. One entry takes at most an eighth.
+            ttl (float): Seconds an entry is served, 0 for no limit.
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # OrderedDict - key -> (body, headers, tags, expiry), least
+        # recently used first
+        self.entries = OrderedDict()
+        # dictionary - tag -> set of the keys of the entries it files
+        self.tagged = {}
+        # int - bytes of the cached bodies
+        self.size = 0
+        # int - number of invalidations, see generation()
+        self.writes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+        self.invalidated = 0
+
+    def get(self, key):
+        """
+        Returns the (body, headers) cached under key, None on a miss.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[3] < time.monotonic():
+                self.__drop(key)
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def generation(self):
+        """returns a number that changes with every invalidation, to take
+        before building a response that put() may store"""
+        return self.writes
+
+    def put(self, key, generation, body, headers, tags):
+        """
+        Caches a response, evicting the least recently used ones.
+
+        Args:
+            key (str): The route and arguments the response answers.
+            generation (int): generation() before the response was built.
+                A response built while the storage was written to may
+                hold stale data, so it is not stored.
+            body (bytes): The body of the response.
+            headers (list): The (name, value) headers to send with it.
+            tags (list): The tags of what the response was built from.
+
+        Returns:
+            bool: Whether the response was stored.
+        """
+        if len(body) > self.max_bytes // 8:
+            return False
+        expiry = time.monotonic() + self.ttl if self.ttl else float("inf")
+        with self.lock:
+            if generation != self.writes:
+                return False
+            if key in self.entries:
+                self.__drop(key)
+            while self.size + len(body) > self.max_bytes:
+                self.__drop(next(iter(self.entries)))
+                self.evicted += 1
+            self.entries[key] = (body, headers, tags, expiry)
+            self.size += len(body)
+            for tag in tags:
+                self.tagged.setdefault(tag, set()).add(key)
+            return True
+
+    def invalidate(self, class_name, id, links):
+        """
+        Drops the responses built from an object that was written to; a
+        listener for storage.subscribe().
+
+        Args:
+            class_name (str): The class of the object, None to drop every
+                response.
+            id (str): The id of the object, None if any object of the
+                class may have changed.
+            links (list): The (foreign key attribute, id) pairs of the
+                object before and after the write.
+        """
+        with self.lock:
+            self.writes += 1
+            if class_name is None:
+                keys = set(self.entries)
+            elif id is None:
+                prefix = class_name + ":"
+                keys = {key for tag, keys in self.tagged.items()
+                        if tag == class_name or tag.startswith(prefix)
+                        for key in keys}
+            else:
+                tags = [class_name, "{}:{}".format(class_name, id)]
+                tags.extend("{}:{}:{}".format(class_name, attr, value)
+                            for attr, value in links)
+                keys = {key for tag in tags
+                        for key in self.tagged.get(tag, ())}
+            for key in keys:
+                self.__drop(key)
+            self.invalidated += len(keys)
+
+    def stats(self):
+        """
+        Reports the use of the cache.
+
+        Returns:
+            dict: The number and bytes of the cached responses, the
+                byte limit, and the number of hits, misses, entries
+                evicted for room, expired and invalidated by writes.
+        """
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.size,
+                    "max_bytes": self.max_bytes, "hits": self.hits,
+                    "misses": self.misses, "evicted": self.evicted,
+                    "expired": self.expired,
+                    "invalidated": self.invalidated}
+
+    def __drop(self, key):
+        """removes an entry and its tags, the lock being held"""
+        body, headers, tags, expiry = self.entries.pop(key)
+        self.size -= len(body)
+        for tag in tags:
+            keys = self.tagged[tag]
+            keys.discard(key)
+            if not keys:
+                del self.tagged[tag]
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+"""
+Compression of API responses with the content coding that the client
+accepts: brotli, when the brotli package is installed, gzip or deflate
+"""
+
+import itertools
+import zlib
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# content codings, by preference when the client accepts several equally
+encodings = (("br",) if brotli else ()) + ("gzip", "deflate")
+# zlib window bits of the zlib-based codings: a gzip or a zlib wrapper
+wbits = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def compressible(response):
+    """returns whether the body of a response may be compressed"""
+    return (response.status_code == 200 and not response.direct_passthrough
+            and "Content-Encoding" not in response.headers
+            and (response.mimetype.startswith("text/") or
+                 response.mimetype == "application/json"))
+
+
+def compress(data, encoding, level):
+    """returns data compressed with a content coding at a level"""
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    compressor = zlib.compressobj(min(level, 9), zlib.DEFLATED,
+                                  wbits[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding, level):
+    """
+    Generates chunks compressed with a content coding at a level.
+
+    Each chunk is flushed, so the client receives as much of the body as
+    was produced, instead of whatever the compressor chooses to emit.
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=level)
+        for chunk in chunks:
+            if chunk:
+                yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(min(level, 9), zlib.DEFLATED,
+                                  wbits[encoding])
+    for chunk in chunks:
+        if chunk:
+            yield (compressor.compress(chunk) +
+                   compressor.flush(zlib.Z_SYNC_FLUSH))
+    yield compressor.flush()
+
+
+def negotiate(request, response, level, min_size):
+    """
+    Compresses a response with the best content coding of a request's
+    Accept-Encoding.
+
+    Bodies shorter than min_size bytes are sent as they are. A streamed
+    body is read until min_size bytes came, then goes on streaming
+    through the compressor.
+
+    Args:
+        request (Request): The request answered.
+        response (Response): Its response, compressed in place.
+        level (int): The compression level, 1 to 9, or to 11 for brotli.
+        min_size (int): The smallest body worth compressing.
+
+    Returns:
+        Response: The response.
+    """
+    if response.status_code == 304:
+        if request.accept_encodings.best_match(encodings):
+            weaken(response)
+        return response
+    if not compressible(response):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(encodings)
+    if encoding is None:
+        return response
+    if not response.is_streamed:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.set_data(compress(data, encoding, level))
+    else:
+        original = response.response
+        chunks = response.iter_encoded()
+        head, size = [], 0
+        for chunk in chunks:
+            head.append(chunk)
+            size += len(chunk)
+            if size >= min_size:
+                break
+        else:
+            response.set_data(b"".join(head))
+            return response
+        response.response = ClosingIterator(
+            compress_stream(itertools.chain(head, chunks), encoding, level),
+            getattr(original, "close", None))
+        response.headers.pop("Content-Length", None)
+    response.headers["Content-Encoding"] = encoding
+    weaken(response)
+    return response
+
+
+def weaken(response):
+    """
+    Makes the ETag of a response weak.
+
+    A strong ETag names one exact body, which the compressed and the
+    plain bodies are not; the weak one still matches If-None-Match.
+    """
+    tag, weak = response.get_etag()
+    if tag is not None and not weak:
+        response.set_etag(tag, weak=True)
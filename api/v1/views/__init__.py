@@ -3,12 +3,205 @@
 Initializes the views module
 """
 
-from flask import Blueprint
+from api.v1.cache import ResponseCache
+from flask import (Blueprint, Response, abort, make_response, request,
+                   stream_with_context)
+from functools import wraps
+import itertools
+from models import storage
+from models.base_model import format_time
+from os import getenv
+from urllib.parse import urlencode
+from werkzeug.http import is_resource_modified
 
 # Create the blueprint object
 app_views = Blueprint('app_views', __name__, url_prefix='/api/v1')
 
 
+# bytes of JSON gathered before a chunk of a streamed array is sent
+chunk_size = 64 * 1024
+
+
+def json_array(objs):
+    """
+    Generates the JSON array of objs, from their cached to_json(), in
+    chunks of about chunk_size bytes.
+
+    Args:
+        objs (iterable): The objects to encode, consumed lazily.
+    """
+    parts, size, separator = ["["], 1, ""
+    for obj in objs:
+        text = separator + obj.to_json()
+        separator = ", "
+        parts.append(text)
+        size += len(text)
+        if size >= chunk_size:
+            yield "".join(parts)
+            parts, size = [], 0
+    parts.append("]\n")
+    yield "".join(parts)
+
+
+def jsonify_objects(objs):
+    """
+    Returns a chunked JSON array response of objs.
+
+    objs is only consumed while the response is sent, with the request
+    context kept alive, so storage.iter() can feed it without the whole
+    array, or every object, being held in memory at once.
+    """
+    return Response(stream_with_context(json_array(objs)),
+                    mimetype="application/json")
+
+
+# largest page a client may ask for with ?limit=
+max_page_size = 1000
+# longest id, the size of the id columns, a client may pass as ?after=
+max_id_size = 60
+
+
+def jsonify_page(cls, attr=None, value=None):
+    """
+    Returns one page of the objects of a class as a JSON array.
+
+    The page holds the ?limit= objects, 1 to max_page_size, that follow
+    the id given in ?after=, in id order; other values answer 400. When
+    more objects follow, a Link header with rel="next" points to the
+    next page.
+
+    Args:
+        cls (class): The class of the objects to list.
+        attr (str, optional): Only list objects whose attr equals value,
+            e.g. "state_id" for the cities of a state.
+        value (str, optional): See attr.
+    """
+    limit = request.args.get("limit", type=int)
+    if limit is None or not 0 < limit <= max_page_size:
+        abort(400, "Invalid limit")
+    after = request.args.get("after")
+    if after is not None and not 0 < len(after) <= max_id_size:
+        abort(400, "Invalid after")
+    objs = storage.page(cls, limit + 1, after, attr, value)
+    response = jsonify_objects(objs[:limit])
+    if len(objs) > limit:
+        link_next(response, after=objs[limit - 1].id)
+    return response
+
+
+def link_next(response, **args):
+    """adds a rel="next" Link to the request URL with args replaced"""
+    args = dict(request.args.to_dict(), **args)
+    response.headers["Link"] = '<{}?{}>; rel="next"'.format(
+        request.base_url, urlencode(args))
+
+
+def version_of(obj):
+    """returns the (tag, last modified) version of a single object, both
+    taken from its updated_at"""
+    return format_time(obj.updated_at), obj.updated_at
+
+
+def conditional(build, *versions):
+    """
+    Answers a conditional GET: 304 Not Modified, without building the
+    body, when the If-None-Match or If-Modified-Since of the request
+    still match, otherwise the response of build(). Both carry an ETag
+    and a Last-Modified header.
+
+    Args:
+        build (callable): Returns the full response.
+        versions (tuple): The (tag, last modified) pairs, from
+            storage.version() or version_of(), of everything the
+            response is built from.
+    """
+    tag = ".".join(version[0] for version in versions)
+    last_modified = max((version[1] for version in versions
+                         if version[1] is not None), default=None)
+    if is_resource_modified(request.environ, etag=tag,
+                            last_modified=last_modified):
+        response = make_response(build())
+    else:
+        response = Response(status=304)
+    response.set_etag(tag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
+
+
+# bytes of response bodies kept by the response cache, 0 to disable it
+cache_bytes = int(getenv("HBNB_API_CACHE_BYTES", str(32 * 1024 * 1024)))
+# seconds a cached response is served; bounds how long the writes of
+# other processes, which do not invalidate it, go unseen
+cache_ttl = float(getenv("HBNB_API_CACHE_TTL", "60"))
+# headers of a response that are cached with its body
+cached_headers = ("Content-Type", "ETag", "Last-Modified", "Link")
+
+response_cache = ResponseCache(cache_bytes, cache_ttl)
+storage.subscribe(response_cache.invalidate)
+
+
+def cached(*tags):
+    """
+    Decorates a GET view to answer from response_cache, keyed by route
+    and query string. Only 200 responses are cached.
+
+    Args:
+        tags (tuple): The tags of what the response is built from, see
+            ResponseCache, formatted with the arguments of the view,
+            e.g. "City:state_id:{state_id}".
+    """
+    def decorator(view):
+        """wraps view"""
+        @wraps(view)
+        def cached_view(**kwargs):
+            """the cached response, or the one view builds"""
+            if not response_cache.max_bytes:
+                return view(**kwargs)
+            key = request.full_path
+            entry = response_cache.get(key)
+            if entry is not None:
+                response = Response(entry[0], headers=entry[1])
+                response.headers["X-Cache"] = "HIT"
+                return response.make_conditional(request)
+            generation = response_cache.generation()
+            response = make_response(view(**kwargs))
+            response.headers["X-Cache"] = "MISS"
+            if response.status_code == 200:
+                body = read_body(response, response_cache.max_bytes // 8)
+                if body is not None:
+                    response_cache.put(
+                        key, generation, body,
+                        [(name, value) for name, value in response.headers
+                         if name in cached_headers],
+                        [tag.format(**kwargs) for tag in tags])
+            return response
+        return cached_view
+    return decorator
+
+
+def read_body(response, limit):
+    """
+    Returns the body of a response if it is at most limit bytes long.
+
+    A streamed body is read until it exceeds limit; the response then
+    goes on streaming from the chunks already read, and None is returned.
+    """
+    if not response.is_streamed:
+        body = response.get_data()
+        return body if len(body) <= limit else None
+    chunks, size = [], 0
+    encoded = response.iter_encoded()
+    for chunk in encoded:
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            response.response = itertools.chain(chunks, encoded)
+            return None
+    response.set_data(b"".join(chunks))
+    return response.get_data()
+
+
 from api.v1.views.index import *
 from api.v1.views.states import *
 from api.v1.views.amenities import *
@@ -17,3 +210,4 @@ from api.v1.views.users import *
 from api.v1.views.places import *
 from api.v1.views.places_reviews import *
 from api.v1.views.places_amenities import *
+from api.v1.views.search import *
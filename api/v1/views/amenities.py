@@ -6,23 +6,28 @@ Module for handling RESTful API actions for Ameneties
 from flask import jsonify, abort, request
 from models import storage
 from models.amenity import Amenity
-from api.v1.views import app_views
+from api.v1.views import (app_views, cached, conditional, jsonify_objects,
+                          jsonify_page, version_of)
 
 
 @app_views.route('/amenities', methods=['GET'], strict_slashes=False)
+@cached("Amenity")
 def get_amenities():
     """Retrieves the list of all Amenity objects"""
-    amenities = storage.all(Amenity).values()
-    return jsonify([amenity.to_dict() for amenity in amenities])
+    version = storage.version(Amenity)
+    if "limit" in request.args:
+        return conditional(lambda: jsonify_page(Amenity), version)
+    return conditional(lambda: jsonify_objects(storage.iter(Amenity)), version)
 
 @app_views.route('/amenities/<amenity_id>', methods=['GET'],
                  strict_slashes=False)
+@cached("Amenity:{amenity_id}")
 def get_amenity(amenity_id):
     """Retrieves an Amenity object"""
     amenity = storage.get(Amenity, amenity_id)
     if amenity is None:
         abort(404)
-    return jsonify(amenity.to_dict())
+    return conditional(lambda: jsonify(amenity.to_dict()), version_of(amenity))
 
 @app_views.route('/amenities/<amenity_id>', methods=['DELETE'],
                  strict_slashes=False)
@@ -62,5 +67,5 @@ def update_amenity(amenity_id):
     for key, value in data.items():
         if key not in ['id', 'created_at', 'updated_at']:
             setattr(amenity, key, value)
-    storage.save()
+    amenity.save()
     return jsonify(amenity.to_dict()), 200
@@ -7,29 +7,36 @@ from flask import jsonify, abort, request
 from models import storage
 from models.state import State
 from models.city import City
-from api.v1.views import app_views
+from api.v1.views import (app_views, cached, conditional, jsonify_objects,
+                          jsonify_page, version_of)
 
 
 @app_views.route('/states/<state_id>/cities', methods=['GET'],
                  strict_slashes=False)
+@cached("State:{state_id}", "City:state_id:{state_id}")
 def get_cities(state_id):
     """Retrieves the list of all City objects of a State"""
     state = storage.get(State, state_id)
     if state is None:
         abort(404)
-    cities = [city.to_dict() for city in state.cities]
+    version = storage.version(City, "state_id", state.id)
+    if "limit" in request.args:
+        return conditional(lambda: jsonify_page(City, "state_id", state.id),
+                           version)
+    cities = state.cities
     if not cities:
         abort(404)
-    return jsonify(cities)
+    return conditional(lambda: jsonify_objects(cities), version)
 
 
 @app_views.route('/cities/<city_id>', methods=['GET'], strict_slashes=False)
+@cached("City:{city_id}")
 def get_city(city_id):
     """Retrieves a City object"""
     city = storage.get(City, city_id)
     if city is None:
         abort(404)
-    return jsonify(city.to_dict())
+    return conditional(lambda: jsonify(city.to_dict()), version_of(city))
 
 
 @app_views.route('/cities/<city_id>', methods=['DELETE'], strict_slashes=False)
@@ -74,5 +81,5 @@ def update_city(city_id):
     for key, value in data.items():
         if key not in ['id', 'state_id', 'created_at', 'updated_at']:
             setattr(city, key, value)
-    storage.save()
+    city.save()
     return jsonify(city.to_dict())
@@ -4,19 +4,34 @@ Index.py structure script
 """
 
 from flask import jsonify
-from api.v1.views import app_views
+from api.v1.views import app_views, cached, response_cache
 from models import storage
 
 
 @app_views.route('/stats', methods=['GET'])
+@cached("Amenity", "City", "Place", "Review", "State", "User")
 def get_stats():
     """Get statistics about the number of objects by type"""
+    counts = storage.count_many(["Amenity", "City", "Place", "Review",
+                                 "State", "User"])
     stats = {
-        "amenities": storage.count("Amenity"),
-        "cities": storage.count("City"),
-        "places": storage.count("Place"),
-        "reviews": storage.count("Review"),
-        "states": storage.count("State"),
-        "users": storage.count("User")
+        "amenities": counts["Amenity"],
+        "cities": counts["City"],
+        "places": counts["Place"],
+        "reviews": counts["Review"],
+        "states": counts["State"],
+        "users": counts["User"]
     }
     return jsonify(stats)
+
+
+@app_views.route('/stats/pool', methods=['GET'])
+def get_pool_stats():
+    """Get the state of the database connection pool"""
+    return jsonify(storage.pool_stats())
+
+
+@app_views.route('/stats/cache', methods=['GET'])
+def get_cache_stats():
+    """Get the hits, misses and size of the response cache"""
+    return jsonify(response_cache.stats())
@@ -4,13 +4,27 @@ Module for handling RESTful API actions for Place objects
 """
 
 
-from flask import jsonify, abort, request
+from flask import jsonify, request
+import math
 from models import storage
-from models.place import Place
-from models.city import City
-from models.state import State
-from models.amenity import Amenity
-from api.v1.views import app_views
+from api.v1.views import app_views, jsonify_objects
+
+
+def on_earth(near, bbox):
+    """
+    Tells whether geo criteria are finite and within the coordinates of
+    the Earth: latitudes within 90 degrees, longitudes within 180 and a
+    radius that is not negative. float() also parses "inf" and "nan".
+    """
+    points = []
+    if near is not None:
+        if not 0 <= near[2] < math.inf:
+            return False
+        points.append(near[:2])
+    if bbox is not None:
+        points.extend((bbox[:2], bbox[2:]))
+    return all(-90 <= lat <= 90 and -180 <= lng <= 180
+               for lat, lng in points)
 
 
 @app_views.route('/places_search', methods=['POST'], strict_slashes=False)
@@ -28,31 +42,46 @@ def search_places():
     cities = search_params.get("cities", [])
     amenities = search_params.get("amenities", [])
 
-    # Retrieve all Place objects if no search criteria provided
-    if not any([states, cities, amenities]):
-        places = storage.all("Place").values()
-    else:
-        # Filter places based on search criteria
-        places = set()
-        if states:
-            for state_id in states:
-                state = storage.get(State, state_id)
-                if state:
-                    places.update(state.places)
-        if cities:
-            for city_id in cities:
-                city = storage.get(City, city_id)
-                if city:
-                    places.update(city.places)
-        if amenities:
-            amenity_objs = (
-                [storage.get(Amenity, amenity_id) for amenity_id in amenities]
-            )
-            # Filter places that have all listed amenities
-            for place in places.copy():
-                if not all(amenity in place.amenities for amenity
-                           in amenity_objs):
-                    places.remove(place)
+    if not all(isinstance(ids, list) and
+               all(isinstance(id, str) for id in ids)
+               for ids in (states, cities, amenities)):
+        return jsonify({"error": "Not a JSON"}), 400
+
+    # Geo criteria: a circle and/or a bounding box
+    try:
+        near = search_params.get("near")
+        if near is not None:
+            near = tuple(float(near[key])
+                         for key in ("lat", "lng", "radius_km"))
+        bbox = search_params.get("bbox")
+        if bbox is not None:
+            bbox = tuple(float(bbox[key]) for key in
+                         ("min_lat", "min_lng", "max_lat", "max_lng"))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Invalid geo criteria"}), 400
+    if not on_earth(near, bbox):
+        return jsonify({"error": "Invalid geo criteria"}), 400
+
+    # Numeric criteria: {"min": ..., "max": ...}, either bound optional
+    ranges = {}
+    for attr in ("price_by_night", "max_guest", "number_rooms",
+                 "number_bathrooms"):
+        bounds = search_params.get(attr)
+        if bounds is None:
+            continue
+        try:
+            ranges[attr] = tuple(None if bounds.get(key) is None
+                                 else float(bounds[key])
+                                 for key in ("min", "max"))
+        except (AttributeError, TypeError, ValueError):
+            return jsonify({"error": "Invalid range for " + attr}), 400
+        if not all(math.isfinite(bound) for bound in ranges[attr]
+                   if bound is not None):
+            return jsonify({"error": "Invalid range for " + attr}), 400
+
+    # Resolved by the storage engine from its indexes
+    places = storage.search_places(states, cities, amenities, near, bbox,
+                                   ranges)
 
     # Serialize and return results
-    return jsonify([place.to_dict() for place in places])
+    return jsonify_objects(places)
@@ -3,21 +3,25 @@
 Place-Amenity API endpoints
 """
 
-from api.v1.views import app_views
+from api.v1.views import (app_views, cached, conditional, jsonify_objects,
+                          version_of)
 from flask import jsonify, abort, request
-from models import storage
+from models import storage, storage_t
 from models.place import Place
 from models.amenity import Amenity
 
 
 @app_views.route('/places/<place_id>/amenities', methods=['GET'])
+@cached("Place:{place_id}", "Amenity")
 def get_place_amenities(place_id):
     """Retrieve list of all amenities of a place."""
     place = storage.get("Place", place_id)
     if place is None:
         abort(404)
 
-    return jsonify([amenity.to_dict() for amenity in place.amenities])
+    # the place's updated_at moves with every link and unlink
+    return conditional(lambda: jsonify_objects(place.amenities),
+                       version_of(place), storage.version(Amenity))
 
 
 @app_views.route('/places/<place_id>/amenities/<amenity_id>',
@@ -32,8 +36,13 @@ def delete_place_amenity(place_id, amenity_id):
     if amenity not in place.amenities:
         abort(404)
 
-    place.amenities.remove(amenity)
-    storage.save()
+    if storage_t == "db":
+        place.amenities.remove(amenity)
+    else:
+        # a new list, so the storage reindexes the place's amenities
+        place.amenity_ids = [amenity_id for amenity_id in place.amenity_ids
+                             if amenity_id != amenity.id]
+    place.save()
 
     return jsonify({})
 
@@ -50,7 +59,10 @@ def link_place_amenity(place_id, amenity_id):
     if amenity in place.amenities:
         return jsonify(amenity.to_dict()), 200
 
-    place.amenities.append(amenity)
-    storage.save()
+    if storage_t == "db":
+        place.amenities.append(amenity)
+    else:
+        place.amenity_ids = place.amenity_ids + [amenity.id]
+    place.save()
 
     return jsonify(amenity.to_dict()), 201
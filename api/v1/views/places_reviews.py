@@ -5,29 +5,37 @@ Module for handling RESTful API actions for Places Review objects
 
 from flask import jsonify, abort, request
 from models import storage
+from models.place import Place
 from models.review import Review
-from api.v1.views import app_views
+from models.user import User
+from api.v1.views import (app_views, cached, conditional, jsonify_objects,
+                          jsonify_page, version_of)
 
 
 @app_views.route('/places/<place_id>/reviews', methods=['GET'],
                  strict_slashes=False)
+@cached("Place:{place_id}", "Review:place_id:{place_id}")
 def get_reviews(place_id):
     """Retrieves the list of all Review objects of a Place"""
     place = storage.get(Place, place_id)
     if place is None:
         abort(404)
-    reviews = [review.to_dict() for review in place.reviews]
-    return jsonify(reviews)
+    version = storage.version(Review, "place_id", place.id)
+    if "limit" in request.args:
+        return conditional(lambda: jsonify_page(Review, "place_id", place.id),
+                           version)
+    return conditional(lambda: jsonify_objects(place.reviews), version)
 
 
 @app_views.route('/reviews/<review_id>', methods=['GET'],
                  strict_slashes=False)
+@cached("Review:{review_id}")
 def get_review(review_id):
     """Retrieves a Review object"""
     review = storage.get(Review, review_id)
     if review is None:
         abort(404)
-    return jsonify(review.to_dict())
+    return conditional(lambda: jsonify(review.to_dict()), version_of(review))
 
 
 @app_views.route('/reviews/<review_id>', methods=['DELETE'],
@@ -80,5 +88,5 @@ def update_review(review_id):
         if key not in ['id', 'user_id', 'place_id', 'created_at',
                        'updated_at']:
             setattr(review, key, value)
-    storage.save()
+    review.save()
     return jsonify(review.to_dict()), 200
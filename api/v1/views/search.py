@@ -0,0 +1,29 @@
+#!/usr/bin/python3
+"""
+Module for the full-text search of places and reviews
+"""
+
+from flask import abort, request
+from models import storage
+from api.v1.views import (app_views, cached, jsonify_objects, link_next,
+                          max_page_size)
+
+
+@app_views.route('/search', methods=['GET'], strict_slashes=False)
+@cached("Place", "Review")
+def search_text():
+    """Ranks the places and reviews whose text matches ?q="""
+    query = request.args.get("q", "")
+    if not query.strip():
+        abort(400, "Missing q")
+    limit = request.args.get("limit", 20, type=int)
+    if not 0 < limit <= max_page_size:
+        abort(400, "Invalid limit")
+    offset = request.args.get("offset", 0, type=int)
+    if offset < 0:
+        abort(400, "Invalid offset")
+    objs = storage.search_text(query, limit + 1, offset)
+    response = jsonify_objects(objs[:limit])
+    if len(objs) > limit:
+        link_next(response, offset=offset + limit)
+    return response
@@ -7,23 +7,28 @@ Module for handling RESTful API actions for State objects
 from models import storage
 from flask import Flask, jsonify, abort, request
 from models.state import State
-from api.v1.views import app_views
+from api.v1.views import (app_views, cached, conditional, jsonify_objects,
+                          jsonify_page, version_of)
 
 
 @app_views.route('/states', methods=['GET'], strict_slashes=False)
+@cached("State")
 def get_states():
     """Retrieves the list of all State objects"""
-    states = storage.all(State).values()
-    return jsonify([state.to_dict() for state in states])
+    version = storage.version(State)
+    if "limit" in request.args:
+        return conditional(lambda: jsonify_page(State), version)
+    return conditional(lambda: jsonify_objects(storage.iter(State)), version)
 
 
 @app_views.route('/states/<state_id>', methods=['GET'], strict_slashes=False)
+@cached("State:{state_id}")
 def get_state(state_id):
     """Retrieves a State object"""
     state = storage.get(State, state_id)
     if state is None:
         abort(404)
-    return jsonify(state.to_dict())
+    return conditional(lambda: jsonify(state.to_dict()), version_of(state))
 
 
 @app_views.route('/states/stats', methods=['GET'], strict_slashes=False)
@@ -76,6 +81,7 @@ def delete_state(state_id):
     if state is None:
         abort(404)
     state.delete()
+    storage.save()
     return jsonify({}), 200
 
 
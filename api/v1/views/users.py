@@ -6,23 +6,28 @@ Module for handling RESTful API actions for USER object
 from flask import jsonify, abort, request
 from models import storage
 from models.user import User
-from api.v1.views import app_views
+from api.v1.views import (app_views, cached, conditional, jsonify_objects,
+                          jsonify_page, version_of)
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
+@cached("User")
 def get_users():
     """Retrieves the list of all User objects"""
-    users = storage.all(User).values()
-    return jsonify([user.to_dict() for user in users])
+    version = storage.version(User)
+    if "limit" in request.args:
+        return conditional(lambda: jsonify_page(User), version)
+    return conditional(lambda: jsonify_objects(storage.iter(User)), version)
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
+@cached("User:{user_id}")
 def get_user(user_id):
     """Retrieves a User object"""
     user = storage.get(User, user_id)
     if user is None:
         abort(404)
-    return jsonify(user.to_dict())
+    return conditional(lambda: jsonify(user.to_dict()), version_of(user))
 
 
 @app_views.route('/users/<user_id>', methods=['DELETE'], strict_slashes=False)
@@ -64,5 +69,5 @@ def update_user(user_id):
     for key, value in data.items():
         if key not in ['id', 'email', 'created_at', 'updated_at']:
             setattr(user, key, value)
-    storage.save()
+    user.save()
     return jsonify(user.to_dict()), 200
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+"""
+Compares storing Places one save() at a time with storage.bulk_new(), in
+file mode and in DB mode against a SQLite file.
+
+The save() loop costs one file rewrite or one commit per Place, so it is
+timed on at most [loop size] Places and reported per Place.
+
+Usage: ./benchmarks/bench_bulk.py [number of places] [loop size]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def measure(mode, n):
+    """stores n places with save() or bulk_new(), returns seconds/place"""
+    sys.path.insert(0, root)
+    from models import storage
+    from models.city import City
+    from models.place import Place
+    from models.state import State
+    from models.user import User
+    state = State(name="State")
+    city = City(name="City", state_id=state.id)
+    user = User(email="user@hbnb.io", password="pwd")
+    storage.bulk_new([state, city, user])
+    places = [Place(city_id=city.id, user_id=user.id,
+                    name="Place {}".format(i), number_rooms=i % 5)
+              for i in range(n)]
+    start = time.perf_counter()
+    if mode == "save":
+        for place in places:
+            place.save()
+    else:
+        storage.bulk_new(places)
+    return (time.perf_counter() - start) / n
+
+
+def run(storage_type, mode, n):
+    """runs measure() in a fresh process and directory"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.pop("HBNB_TYPE_STORAGE", None)
+        if storage_type == "db":
+            env.update(HBNB_TYPE_STORAGE="db",
+                       HBNB_DB_URL="sqlite:///" + os.path.join(tmp, "hbnb.db"))
+        out = subprocess.check_output([sys.executable, os.path.abspath(
+            __file__), "--measure", mode, str(n)], env=env, cwd=tmp)
+    return float(out)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3 and sys.argv[1] == "--measure":
+        print(measure(sys.argv[2], int(sys.argv[3])))
+        sys.exit(0)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    loop = min(n, int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
+    print("{} places, save() loop timed on {}".format(n, loop))
+    for storage_type in ("file", "db"):
+        saved = run(storage_type, "save", loop)
+        bulk = run(storage_type, "bulk", n)
+        print("{:<6}{:>14.1f} us/place save(){:>12.1f} us/place bulk_new()"
+              "{:>10.0f}x".format(storage_type, saved * 1e6, bulk * 1e6,
+                                  saved / bulk))
@@ -0,0 +1,41 @@
+#!/usr/bin/python3
+"""
+Compares the fast timestamp parser/formatter of BaseModel with strptime
+and strftime.
+
+Usage: ./benchmarks/bench_datetime.py [number of timestamps]
+"""
+
+from datetime import datetime, timedelta
+import os
+import sys
+from timeit import default_timer as timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from models.base_model import format_time, parse_time, time  # noqa: E402
+
+
+def bench(label, func, values):
+    """runs func over values and prints the elapsed time"""
+    start = timer()
+    for value in values:
+        func(value)
+    elapsed = timer() - start
+    print("{:<28}{:>8.3f}s".format(label, elapsed))
+    return elapsed
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    base = datetime(2017, 9, 28, 21, 3, 54, 52302)
+    dates = [base + timedelta(seconds=i, microseconds=i) for i in range(n)]
+    strings = [d.strftime(time) for d in dates]
+    assert [parse_time(s) for s in strings[:1000]] == dates[:1000]
+    assert [format_time(d) for d in dates[:1000]] == strings[:1000]
+    print("{} timestamps".format(n))
+    slow = bench("strptime", lambda s: datetime.strptime(s, time), strings)
+    fast = bench("parse_time", parse_time, strings)
+    print("{:<28}{:>8.1f}x".format("parse speedup", slow / fast))
+    slow = bench("strftime", lambda d: d.strftime(time), dates)
+    fast = bench("format_time", format_time, dates)
+    print("{:<28}{:>8.1f}x".format("format speedup", slow / fast))
@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""
+Times the full-text index on a synthetic review corpus: building it, and
+answering queries compared with a scan that tokenizes every review.
+
+Word frequencies follow a Zipf distribution, so the queries range from
+rare to very common words.
+
+Usage: ./benchmarks/bench_fulltext.py [number of reviews]
+"""
+
+import os
+import random
+import sys
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def run(n):
+    """builds an index of n reviews and times a few queries"""
+    sys.path.insert(0, root)
+    from models.engine.fulltext import FullTextIndex, tokenize
+    random.seed(0)
+    vocabulary = ["w{}".format(i) for i in range(20000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    words = random.choices(vocabulary, weights, k=n * 12)
+    texts = [" ".join(words[i:i + 12]) for i in range(0, n * 12, 12)]
+    del words
+
+    start = time.perf_counter()
+    index = FullTextIndex()
+    for i, text in enumerate(texts):
+        index.add("Review.{}".format(i), text)
+    built = time.perf_counter() - start
+    print("{} reviews indexed in {:.1f} s".format(n, built))
+
+    for query in ("w15000", "w500", "w20 w400", "w1"):
+        start = time.perf_counter()
+        found = index.search(query, 20)
+        indexed = time.perf_counter() - start
+        terms = set(tokenize(query))
+        start = time.perf_counter()
+        scanned = [i for i, text in enumerate(texts)
+                   if terms.intersection(tokenize(text))]
+        scan = time.perf_counter() - start
+        print("{:<10}{:>9} matches{:>10.2f} ms index{:>10.0f} ms scan"
+              .format(repr(query), len(scanned), indexed * 1e3,
+                      scan * 1e3))
+        assert len(found) == min(20, len(scanned))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""
+Compares radius searches answered by the FileStorage grid index with a
+naive haversine scan over every place.
+
+Usage: ./benchmarks/bench_geo.py [number of places] [radius in km]
+"""
+
+import os
+import random
+import sys
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def timed(search, centers):
+    """returns the mean seconds per search and the number of results"""
+    start = time.perf_counter()
+    found = sum(len(search(lat, lng)) for lat, lng in centers)
+    return (time.perf_counter() - start) / len(centers), found
+
+
+def run(n, radius):
+    """times 100 radius searches over n places spread over Europe"""
+    sys.path.insert(0, root)
+    os.environ.pop("HBNB_TYPE_STORAGE", None)
+    from models import storage
+    from models.engine.geo import haversine
+    from models.place import Place
+    random.seed(0)
+    storage._FileStorage__objects = {}
+    places = [Place(latitude=random.uniform(35.0, 60.0),
+                    longitude=random.uniform(-10.0, 30.0))
+              for i in range(n)]
+    for place in places:
+        storage.new(place)
+    centers = [(random.uniform(35.0, 60.0), random.uniform(-10.0, 30.0))
+               for i in range(100)]
+
+    def scan(lat, lng):
+        """the places within radius of a center, by distance to each"""
+        return [place for place in places
+                if haversine(lat, lng, place.latitude,
+                             place.longitude) <= radius]
+
+    def grid(lat, lng):
+        """the places within radius of a center, through the grid index"""
+        return storage.search_places(near=(lat, lng, radius))
+
+    scanned, expected = timed(scan, centers)
+    indexed, found = timed(grid, centers)
+    assert found == expected
+    print("{} places, {} km radius, {} results".format(n, radius, found))
+    print("{:<16}{:>12.3f} ms/search".format("haversine scan",
+                                             scanned * 1e3))
+    print("{:<16}{:>12.3f} ms/search{:>10.0f}x".format(
+        "grid index", indexed * 1e3, scanned / indexed))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 10.0)
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+"""
+Reports the memory used per file-mode model instance, with and without
+HBNB_COMPACT_MODELS.
+
+Usage: ./benchmarks/bench_memory.py [number of reviews]
+"""
+
+from datetime import datetime
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+import uuid
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def measure(n):
+    """builds n reviews from JSON records and returns bytes per review"""
+    sys.path.insert(0, root)
+    from models.review import Review
+    from models.base_model import format_time
+    now = format_time(datetime.utcnow())
+    places = [str(uuid.uuid4()) for i in range(100)]
+    users = [str(uuid.uuid4()) for i in range(100)]
+    text = json.dumps([{"id": str(uuid.uuid4()), "created_at": now,
+                        "updated_at": now, "__class__": "Review",
+                        "place_id": places[i % 100],
+                        "user_id": users[i % 100],
+                        "text": "Review number {}".format(i)}
+                       for i in range(n)])
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = json.loads(text)
+    reviews = [Review(**record) for record in records]
+    del records
+    after = tracemalloc.get_traced_memory()[0]
+    return (after - before) / n
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--measure":
+        print(measure(int(sys.argv[2])))
+        sys.exit(0)
+    n = sys.argv[1] if len(sys.argv) > 1 else "100000"
+    results = {}
+    for compact in ("0", "1"):
+        env = dict(os.environ, HBNB_COMPACT_MODELS=compact)
+        env.pop("HBNB_TYPE_STORAGE", None)
+        out = subprocess.check_output([sys.executable, __file__,
+                                       "--measure", n], env=env)
+        results[compact] = float(out)
+    print("{} reviews".format(n))
+    print("{:<28}{:>8.0f} bytes".format("regular instances", results["0"]))
+    print("{:<28}{:>8.0f} bytes".format("compact instances", results["1"]))
+    print("{:<28}{:>8.0f} bytes".format("saved per object",
+                                        results["0"] - results["1"]))
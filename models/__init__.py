@@ -7,6 +7,9 @@ from os import getenv
 
 
 storage_t = getenv("HBNB_TYPE_STORAGE")
+# HBNB_COMPACT_MODELS=1 stores file-mode model attributes in __slots__
+compact_models = (storage_t != "db" and
+                  getenv("HBNB_COMPACT_MODELS") == "1")
 
 if storage_t == "db":
     from models.engine.db_storage import DBStorage
@@ -4,27 +4,87 @@ Contains class BaseModel
 """
 
 from datetime import datetime
+import json
 import models
 from os import getenv
 import sqlalchemy
 from sqlalchemy import Column, String, DateTime
 from sqlalchemy.ext.declarative import declarative_base
+import sys
 import uuid
+import weakref
 
 time = "%Y-%m-%dT%H:%M:%S.%f"
+# file-mode objects -> [to_dict() result, JSON text or None], until changed
+serialized = weakref.WeakKeyDictionary()
+
+
+def parse_time(value):
+    """parses a string in the `time` format into a datetime"""
+    if (len(value) == 26 and value[10] == "T" and value[19] == "." and
+            value[20:].isdigit()):
+        return datetime.fromisoformat(value)
+    return datetime.strptime(value, time)
+
+
+def format_time(value):
+    """formats a datetime as a string in the `time` format"""
+    if value.tzinfo is None and value.year >= 1000:
+        if value.microsecond:
+            return value.isoformat()
+        return value.isoformat() + ".000000"
+    return value.strftime(time)
+
+
+class CompactModel(type):
+    """Metaclass of the compact file-mode models
+
+    Every class-level default such as `name = ""` becomes a slot, and the
+    default is kept in _defaults, where BaseModel.__getattr__ finds it
+    while the slot is unset. Instances then have no per-instance __dict__.
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        """creates the class with one slot per field"""
+        defaults = {}
+        for base in reversed(bases):
+            defaults.update(getattr(base, "_defaults", {}))
+        slots = list(namespace.pop("__slots__", ()))
+        for key, value in list(namespace.items()):
+            if not key.startswith("__") and not hasattr(value, "__get__"):
+                defaults[key] = namespace.pop(key)
+                slots.append(key)
+        namespace["__slots__"] = tuple(slots)
+        namespace["_defaults"] = defaults
+        cls = super().__new__(mcs, name, bases, namespace)
+        cls._slots = tuple((slot, vars(klass)[slot])
+                           for klass in reversed(cls.__mro__)
+                           for slot in vars(klass).get("__slots__", ())
+                           if slot not in ("_extra", "__weakref__"))
+        return cls
+
 
 if models.storage_t == "db":
     Base = declarative_base()
 else:
     Base = object
 
+if models.compact_models:
+    Meta = CompactModel
+else:
+    Meta = type
+
 
-class BaseModel:
+class BaseModel(metaclass=Meta):
     """The BaseModel class from which future classes will be derived"""
     if models.storage_t == "db":
         id = Column(String(60), primary_key=True)
         created_at = Column(DateTime, default=datetime.utcnow)
         updated_at = Column(DateTime, default=datetime.utcnow)
+    elif models.compact_models:
+        __slots__ = ("id", "created_at", "updated_at", "__weakref__")
+        # dictionary - attributes that are not fields of the class
+        _extra = None
 
     def __init__(self, *args, **kwargs):
         """Initialization of the base model"""
@@ -33,11 +93,11 @@ class BaseModel:
                 if key != "__class__":
                     setattr(self, key, value)
             if kwargs.get("created_at", None) and type(self.created_at) is str:
-                self.created_at = datetime.strptime(kwargs["created_at"], time)
+                self.created_at = parse_time(kwargs["created_at"])
             else:
                 self.created_at = datetime.utcnow()
             if kwargs.get("updated_at", None) and type(self.updated_at) is str:
-                self.updated_at = datetime.strptime(kwargs["updated_at"], time)
+                self.updated_at = parse_time(kwargs["updated_at"])
             else:
                 self.updated_at = datetime.utcnow()
             if kwargs.get("id", None) is None:
@@ -47,6 +107,53 @@ class BaseModel:
             self.created_at = datetime.utcnow()
             self.updated_at = self.created_at
 
+    if models.compact_models:
+        def __setattr__(self, name, value):
+            """sets a slot or an extra attribute and reports the change"""
+            old = getattr(self, name, None)
+            if type(value) is str and (name == "id" or name.endswith("_id")):
+                value = sys.intern(value)
+            if hasattr(type(self), name):
+                object.__setattr__(self, name, value)
+            else:
+                if self._extra is None:
+                    object.__setattr__(self, "_extra", {})
+                self._extra[name] = value
+            if serialized:
+                serialized.pop(self, None)
+            models.storage.changed(self, name, old)
+
+        def __getattr__(self, name):
+            """returns the default of an unset slot or an extra attribute"""
+            defaults = type(self)._defaults
+            if name in defaults:
+                return defaults[name]
+            if self._extra is not None and name in self._extra:
+                return self._extra[name]
+            raise AttributeError("{!r} object has no attribute {!r}".format(
+                type(self).__name__, name))
+
+        @property
+        def __dict__(self):
+            """the set slots and extra attributes, as a new dictionary"""
+            attrs = {}
+            for name, slot in type(self)._slots:
+                try:
+                    attrs[name] = slot.__get__(self)
+                except AttributeError:
+                    pass
+            if self._extra is not None:
+                attrs.update(self._extra)
+            return attrs
+    elif models.storage_t != "db":
+        def __setattr__(self, name, value):
+            """sets an attribute and reports the change to the storage"""
+            old = self.__dict__.get(name, getattr(type(self), name, None))
+            super().__setattr__(name, value)
+            if serialized:
+                serialized.pop(self, None)
+            models.storage.changed(self, name, old)
+
     def __str__(self):
         """String representation of the BaseModel class"""
         return "[{:s}] ({:s}) {}".format(self.__class__.__name__, self.id,
@@ -60,16 +167,33 @@ class BaseModel:
 
     def to_dict(self):
         """returns a dictionary containing all keys/values of the instance"""
+        cached = serialized.get(self)
+        if cached is not None:
+            return cached[0].copy()
         new_dict = self.__dict__.copy()
         if "created_at" in new_dict:
-            new_dict["created_at"] = new_dict["created_at"].strftime(time)
+            new_dict["created_at"] = format_time(new_dict["created_at"])
         if "updated_at" in new_dict:
-            new_dict["updated_at"] = new_dict["updated_at"].strftime(time)
+            new_dict["updated_at"] = format_time(new_dict["updated_at"])
         new_dict["__class__"] = self.__class__.__name__
         if "_sa_instance_state" in new_dict:
             del new_dict["_sa_instance_state"]
+        if models.storage_t != "db":
+            serialized[self] = [new_dict, None]
+            return new_dict.copy()
         return new_dict
 
+    def to_json(self):
+        """returns the JSON text of to_dict(), cached until the next change"""
+        cached = serialized.get(self)
+        if cached is None or cached[1] is None:
+            text = json.dumps(self.to_dict())
+            cached = serialized.get(self)
+            if cached is None:
+                return text
+            cached[1] = text
+        return cached[1]
+
     def delete(self):
         """delete the current instance from the storage"""
         models.storage.delete(self)
@@ -22,3 +22,9 @@ class City(BaseModel, Base):
     def __init__(self, *args, **kwargs):
         """initializes city"""
         super().__init__(*args, **kwargs)
+
+    if models.storage_t != "db":
+        @property
+        def places(self):
+            """getter attribute returns the list of Place instances"""
+            return models.storage.related("Place", "city_id", self.id)
@@ -3,9 +3,12 @@
 Contains the class DBStorage
 """
 
+from datetime import datetime
 import models
 from models.amenity import Amenity
-from models.base_model import BaseModel, Base
+from models.base_model import BaseModel, Base, parse_time
+from models.engine import geo
+from models.engine.fulltext import FullTextIndex, text_keys
 from models.city import City
 from models.place import Place
 from models.review import Review
@@ -13,17 +16,120 @@ from models.state import State
 from models.user import User
 from os import getenv
 import sqlalchemy
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import (Column, DateTime, Integer, String, Table,
+                        create_engine, event, exc, func, insert, literal,
+                        or_, select, text, update)
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import scoped_session, selectinload, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+import time
+import uuid
 
 classes = {"Amenity": Amenity, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
+# HBNB_COUNT_CACHE_TTL: seconds count_many() may reuse a count, 0 to disable
+count_cache_ttl = float(getenv("HBNB_COUNT_CACHE_TTL", "0"))
+# HBNB_MYSQL_POOL_*: connection pool settings, SQLAlchemy's defaults if unset
+pool_size = int(getenv("HBNB_MYSQL_POOL_SIZE", "5"))
+max_overflow = int(getenv("HBNB_MYSQL_MAX_OVERFLOW", "10"))
+pool_timeout = float(getenv("HBNB_MYSQL_POOL_TIMEOUT", "30"))
+pool_recycle = int(getenv("HBNB_MYSQL_POOL_RECYCLE", "-1"))
+pool_pre_ping = getenv("HBNB_MYSQL_POOL_PRE_PING") == "1"
+# HBNB_DB_URL: database URL replacing the HBNB_MYSQL_* connection settings
+db_url = getenv("HBNB_DB_URL")
+# HBNB_SQLITE_PRAGMAS: comma separated PRAGMAs run on each SQLite connection
+sqlite_pragmas = getenv("HBNB_SQLITE_PRAGMAS",
+                        "journal_mode=WAL,synchronous=NORMAL,"
+                        "foreign_keys=ON,busy_timeout=5000")
+
+if models.storage_t == 'db':
+    # one row per class, bumped by every transaction that inserts, updates
+    # or deletes rows of it, see DBStorage.version()
+    versions = Table('versions', Base.metadata,
+                     Column('name', String(60), primary_key=True),
+                     Column('stamp', Integer, nullable=False, default=0),
+                     Column('updated_at', DateTime, nullable=True))
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        """Instantiate the pool with its wait counters at zero"""
+        super().__init__(*args, **kwargs)
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        """checks out a connection, timing the wait for it"""
+        start = time.monotonic()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            self.waits += 1
+            self.wait_time += elapsed
+            self.max_wait = max(self.max_wait, elapsed)
+
+
+def engine(url):
+    """
+    Creates the engine of a database URL with the configured pool.
+
+    Args:
+        url (str): Any SQLAlchemy database URL.
+
+    Returns:
+        Engine: The engine. Dialects that pool with a QueuePool get a
+            TimedQueuePool sized by the HBNB_MYSQL_POOL_* settings; the
+            others keep their own pool, except in-memory SQLite which
+            shares one connection between threads. SQLite connections
+            run the HBNB_SQLITE_PRAGMAS.
+    """
+    url = make_url(url)
+    options = {"pool_recycle": pool_recycle, "pool_pre_ping": pool_pre_ping}
+    sqlite = url.get_backend_name() == "sqlite"
+    if sqlite and url.database in (None, "", ":memory:"):
+        options.update(poolclass=StaticPool,
+                       connect_args={"check_same_thread": False})
+    elif issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        options.update(poolclass=TimedQueuePool, pool_size=pool_size,
+                       max_overflow=max_overflow, pool_timeout=pool_timeout)
+    new_engine = create_engine(url, **options)
+    if sqlite:
+        pragmas = [pragma.strip() for pragma in sqlite_pragmas.split(",")
+                   if pragma.strip()]
+
+        @event.listens_for(new_engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            """runs the configured PRAGMAs on a new SQLite connection"""
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute("PRAGMA " + pragma)
+            cursor.close()
+    return new_engine
+
 
 class DBStorage:
     """interaacts with the MySQL database"""
     __engine = None
     __session = None
+    # dictionary - class name -> (time.monotonic() deadline, count)
+    __counts = {}
+    # FullTextIndex - text of the rows of text_keys, built by the first
+    # search_text()
+    __fulltext = None
+    # dictionary - class name -> versions stamp of each class of text_keys
+    # that __fulltext holds the rows of
+    __fulltext_stamps = None
+    # list - callables told of every committed write, see subscribe()
+    __listeners = []
 
     def __init__(self):
         """Instantiate a DBStorage object"""
@@ -32,20 +138,54 @@ class DBStorage:
         HBNB_MYSQL_HOST = getenv('HBNB_MYSQL_HOST')
         HBNB_MYSQL_DB = getenv('HBNB_MYSQL_DB')
         HBNB_ENV = getenv('HBNB_ENV')
-        self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.
-                                      format(HBNB_MYSQL_USER,
-                                             HBNB_MYSQL_PWD,
-                                             HBNB_MYSQL_HOST,
-                                             HBNB_MYSQL_DB))
+        self.__engine = engine(db_url or 'mysql+mysqldb://{}:{}@{}/{}'.
+                               format(HBNB_MYSQL_USER,
+                                      HBNB_MYSQL_PWD,
+                                      HBNB_MYSQL_HOST,
+                                      HBNB_MYSQL_DB))
         if HBNB_ENV == "test":
             Base.metadata.drop_all(self.__engine)
 
-    def all(self, cls=None):
-        """query on the current database session"""
+    @staticmethod
+    def __loaders(cls, load):
+        """
+        Builds the eager loading options of a query on cls.
+
+        Args:
+            cls (class): The class being queried.
+            load (list): Relationship paths such as "cities" or
+                "cities.places", each loaded with one SELECT ... IN query
+                per level instead of one query per parent object.
+
+        Returns:
+            list: The options to pass to Query.options().
+        """
+        options = []
+        for path in load or ():
+            option, owner = None, cls
+            for name in path.split("."):
+                attr = getattr(owner, name)
+                if option is None:
+                    option = selectinload(attr)
+                else:
+                    option = option.selectinload(attr)
+                owner = attr.property.mapper.class_
+            options.append(option)
+        return options
+
+    def all(self, cls=None, load=None):
+        """query on the current database session
+
+        load lists the relationships of cls to load eagerly, see __loaders.
+        """
         new_dict = {}
         for clss in classes:
             if cls is None or cls is classes[clss] or cls is clss:
-                objs = self.__session.query(classes[clss]).all()
+                query = self.__session.query(classes[clss])
+                if load and cls is not None:
+                    query = query.options(*self.__loaders(classes[clss],
+                                                          load))
+                objs = query.all()
                 for obj in objs:
                     key = obj.__class__.__name__ + '.' + obj.id
                     new_dict[key] = obj
@@ -58,6 +198,90 @@ class DBStorage:
     def save(self):
         """commit all changes of the current database session"""
         self.__session.commit()
+        self.__counts.clear()
+        written = self.__session.info.pop("written", [])
+        for listener in self.__listeners:
+            for class_name, id, links in written:
+                listener(class_name, id, links)
+
+    def subscribe(self, listener):
+        """
+        Registers a callable to tell about every committed write, e.g. to
+        invalidate cached API responses.
+
+        Args:
+            listener (callable): Called after save() as
+                listener(class_name, id, links) for every row the
+                transaction inserted, updated or deleted, links being the
+                (foreign key column, id) pairs of the row before and after
+                the change. An id of None means that any row of the class
+                may have changed, as after bulk_upsert().
+        """
+        self.__listeners.append(listener)
+
+    def bulk_new(self, objs):
+        """
+        Adds several objects and commits them in one transaction.
+
+        The objects carry their ids, so the flush sends the rows of each
+        table as a single executemany INSERT.
+
+        Args:
+            objs (iterable): The objects to add.
+        """
+        self.__session.add_all(objs)
+        self.save()
+
+    def bulk_upsert(self, dicts):
+        """
+        Creates or updates rows from to_dict() dictionaries in one
+        transaction.
+
+        Args:
+            dicts (iterable): Dictionaries holding the __class__ of a row
+                and, optionally, its id. Rows whose id exists are updated
+                with the other keys, the others are inserted. Each table
+                costs one SELECT of the existing ids, one executemany
+                INSERT and one executemany UPDATE.
+        """
+        now = datetime.utcnow()
+        rows = {}
+        for values in dicts:
+            cls = classes[values["__class__"]]
+            columns = cls.__table__.columns.keys()
+            row = {key: value for key, value in values.items()
+                   if key in columns}
+            for key in ("created_at", "updated_at"):
+                if isinstance(row.get(key), str):
+                    row[key] = parse_time(row[key])
+            row.setdefault("updated_at", now)
+            if row.get("id") is None:
+                row["id"] = str(uuid.uuid4())
+            rows.setdefault(cls, {})[row["id"]] = row
+        for cls, by_id in rows.items():
+            ids = list(by_id)
+            existing = set()
+            for start in range(0, len(ids), 1000):
+                existing.update(self.__session.scalars(
+                    select(cls.id).where(cls.id.in_(ids[start:start + 1000]))))
+            inserts = [row for id, row in by_id.items() if id not in existing]
+            updates = [{key: value for key, value in row.items()
+                        if key != "created_at"}
+                       for id, row in by_id.items() if id in existing]
+            for row in inserts:
+                row.setdefault("created_at", now)
+            if inserts:
+                self.__session.execute(insert(cls), inserts)
+            if updates:
+                self.__session.execute(update(cls), updates)
+        # the bulk statements bypass the objects already in the session
+        # and the flush events that maintain the full-text index
+        self.__session.expire_all()
+        self.__fulltext = None
+        self.__session.info.setdefault("written", []).extend(
+            (cls.__name__, None, []) for cls in rows)
+        self.__stamp(self.__session, [cls.__name__ for cls in rows])
+        self.save()
 
     def delete(self, obj=None):
         """delete from the current database session obj if not None"""
@@ -67,10 +291,84 @@ class DBStorage:
     def reload(self):
         """reloads data from the database"""
         Base.metadata.create_all(self.__engine)
+        with self.__engine.connect() as connection:
+            stamped = set(connection.scalars(select(versions.c.name)))
+            # a class starts at the time its rows were last updated
+            missing = [{"name": name, "stamp": 0, "updated_at":
+                        connection.scalar(select(func.max(cls.updated_at)))}
+                       for name, cls in classes.items()
+                       if name not in stamped]
+            try:
+                if missing:
+                    connection.execute(insert(versions), missing)
+                connection.commit()
+            except exc.IntegrityError:
+                # another process created them first
+                connection.rollback()
         sess_factory = sessionmaker(bind=self.__engine, expire_on_commit=False)
+        event.listen(sess_factory, "after_flush", self.__flushed)
         Session = scoped_session(sess_factory)
         self.__session = Session
 
+    def __flushed(self, session, flush_context):
+        """applies the objects flushed by a session to the full-text index
+        and keeps them for the listeners told by save()"""
+        class_names = {obj.__class__.__name__ for obj in (
+            *session.new, *session.dirty, *session.deleted)}
+        self.__stamp(session, class_names)
+        if self.__listeners:
+            written = session.info.setdefault("written", [])
+            written.extend(self.__written(obj) for obj in (
+                *session.new, *session.dirty, *session.deleted))
+        if self.__fulltext is None:
+            return
+        # the index follows this flush, so it holds the rows at the
+        # stamps just bumped; writes of other processes bump them again
+        for class_name in class_names.intersection(text_keys):
+            self.__fulltext_stamps[class_name] += 1
+        for obj in session.deleted:
+            self.__fulltext.remove(obj.__class__.__name__ + "." + obj.id)
+        for obj in list(session.new) + list(session.dirty):
+            class_name = obj.__class__.__name__
+            if class_name in text_keys:
+                self.__fulltext.add(class_name + "." + obj.id, " ".join(
+                    value for value in (getattr(obj, attr)
+                                        for attr in text_keys[class_name])
+                    if value))
+
+    @staticmethod
+    def __stamp(session, class_names):
+        """
+        Bumps the version of classes in the transaction of a session, so
+        that it is committed or rolled back with the rows written.
+
+        Args:
+            session (Session): The session writing the rows.
+            class_names (iterable): The names of the classes written to.
+        """
+        class_names = [name for name in class_names if name in classes]
+        if class_names:
+            session.connection().execute(
+                update(versions).where(versions.c.name.in_(class_names))
+                .values(stamp=versions.c.stamp + 1,
+                        updated_at=datetime.utcnow()))
+
+    @staticmethod
+    def __written(obj):
+        """returns the (class name, id, links) of a flushed object"""
+        state = sqlalchemy.inspect(obj)
+        links = []
+        for column in obj.__table__.columns:
+            if not column.foreign_keys:
+                continue
+            history = state.attrs[column.key].history
+            if not history.sum():
+                # not loaded, so the parents it belonged to are unknown
+                return obj.__class__.__name__, None, []
+            links.extend((column.key, value) for value in history.sum()
+                         if value is not None)
+        return obj.__class__.__name__, obj.id, links
+
     def close(self):
         """call remove() method on the private session attribute"""
         self.__session.remove()
@@ -83,12 +381,240 @@ class DBStorage:
             if isinstance(cls, type):
                 return self.__session.query(cls).count()
         else:
-            total_count = 0
-            class_list = [State, City, Place, Amenity, Review, User]
-            for c in class_list:
-                total_count += self.__session.query(c).count()
-            return total_count
-
-    def get(self, cls, id):
-        """Retrieve a single object by its class and ID."""
-        return self.__session.query(cls).filter_by(id=id).first()
+            return sum(self.count_many().values())
+
+    def count_many(self, clss=None, approximate=False):
+        """
+        Counts the objects of several classes in one round trip.
+
+        Args:
+            clss (list, optional): Classes or class names, all by default.
+            approximate (bool): Use the row estimates kept by MySQL in
+                information_schema instead of counting every row.
+
+        Returns:
+            dict: The number of objects by class name.
+        """
+        names = [c if isinstance(c, str) else c.__name__
+                 for c in (clss or classes)]
+        if approximate and self.__engine.dialect.name == "mysql":
+            rows = self.__session.execute(text(
+                "SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES"
+                " WHERE TABLE_SCHEMA = DATABASE()"))
+            tables = {table: rows or 0 for table, rows in rows}
+            return {name: int(tables.get(classes[name].__tablename__, 0))
+                    for name in names}
+        now = time.monotonic()
+        counts = {}
+        for name in names:
+            cached = self.__counts.get(name)
+            if cached is not None and cached[0] > now:
+                counts[name] = cached[1]
+        queries = [self.__session.query(literal(name),
+                                        func.count(classes[name].id))
+                   for name in names if name not in counts]
+        if queries:
+            for name, count in queries[0].union_all(*queries[1:]).all():
+                counts[name] = count
+                if count_cache_ttl > 0:
+                    self.__counts[name] = (now + count_cache_ttl, count)
+        return {name: counts[name] for name in names}
+
+    def get(self, cls, id, load=None):
+        """Retrieve a single object by its class and ID.
+
+        load lists the relationships to load eagerly, as for all().
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        query = self.__session.query(cls)
+        if load:
+            query = query.options(*self.__loaders(cls, load))
+        return query.filter_by(id=id).first()
+
+    def search_places(self, states=(), cities=(), amenities=(), near=None,
+                      bbox=None, ranges=None):
+        """
+        Finds the places of some states and cities having some amenities.
+
+        Args:
+            states (list): State ids; their cities are searched.
+            cities (list): City ids whose places are searched as well.
+                With neither states nor cities, every place is searched.
+            amenities (list): Amenity ids a place must all have.
+            near (tuple, optional): (lat, lng, radius_km) of a circle the
+                places must be in.
+            bbox (tuple, optional): (min_lat, min_lng, max_lat, max_lng) of
+                a box the places must be in.
+            ranges (dict, optional): column -> (min, max) bounds the numeric
+                columns of the places must be within; either bound may be
+                None.
+
+        Returns:
+            list: The matching places, read with a single query. The
+                amenities are matched through the amenity_id index of
+                place_amenity, grouped by place. A circle is queried as
+                its bounding box, a range scan of the latitude index, and
+                its corners are then cut off by distance. Each range is
+                a predicate the column's own index can answer.
+        """
+        from models.place import place_amenity
+        query = self.__session.query(Place)
+        if states or cities:
+            query = query.filter(or_(
+                Place.city_id.in_(select(City.id)
+                                  .where(City.state_id.in_(states))),
+                Place.city_id.in_(cities)))
+        amenities = set(amenities)
+        if amenities:
+            query = query.filter(Place.id.in_(
+                select(place_amenity.c.place_id)
+                .where(place_amenity.c.amenity_id.in_(amenities))
+                .group_by(place_amenity.c.place_id)
+                .having(func.count() == len(amenities))))
+        for attr, (low, high) in (ranges or {}).items():
+            if low is not None:
+                query = query.filter(getattr(Place, attr) >= low)
+            if high is not None:
+                query = query.filter(getattr(Place, attr) <= high)
+        for box in (bbox, near and geo.bounds(*near)):
+            if box is not None:
+                query = query.filter(Place.latitude.between(box[0], box[2]),
+                                     Place.longitude.between(box[1], box[3]))
+        if near is None:
+            return query.all()
+        return [place for place in query
+                if geo.within(place.latitude, place.longitude, near=near)]
+
+    def search_text(self, query, limit=20, offset=0):
+        """
+        Ranks the places and reviews whose text matches a query.
+
+        Args:
+            query (str): The words to look for in Place.description and
+                Review.text.
+            limit (int): The maximum number of objects to return.
+            offset (int): The number of best matches to skip.
+
+        Returns:
+            list: The objects, best BM25 score first. The index is read
+                from the text columns on the first search, then updated
+                by the flushes of this process. It is read again when
+                the versions stamps of Place or Review show writes it
+                did not see, from other processes or rolled back.
+        """
+        stamps = dict(self.__session.execute(
+            select(versions.c.name, versions.c.stamp)
+            .where(versions.c.name.in_(list(text_keys)))).all())
+        if self.__fulltext is None or stamps != self.__fulltext_stamps:
+            fulltext = FullTextIndex()
+            for class_name, attrs in text_keys.items():
+                cls = classes[class_name]
+                rows = self.__session.query(
+                    cls.id, *[getattr(cls, attr) for attr in attrs])
+                for row in rows.yield_per(10000):
+                    fulltext.add(class_name + "." + row[0],
+                                 " ".join(value for value in row[1:]
+                                          if value))
+            self.__fulltext = fulltext
+            self.__fulltext_stamps = stamps
+        ranked = [key.split(".", 1) for key, score in
+                  self.__fulltext.search(query, limit, offset)]
+        objs = {}
+        for class_name in {class_name for class_name, id in ranked}:
+            cls = classes[class_name]
+            ids = [id for name, id in ranked if name == class_name]
+            for obj in self.__session.query(cls).filter(cls.id.in_(ids)):
+                objs[(class_name, obj.id)] = obj
+        return [objs[(class_name, id)] for class_name, id in ranked
+                if (class_name, id) in objs]
+
+    def iter(self, cls, batch_size=1000):
+        """
+        Yields the objects of a class, fetching batch_size rows at a time.
+
+        Args:
+            cls (class or str): The class of the objects to yield.
+            batch_size (int): The number of rows fetched per round trip.
+                The rows are streamed from a server-side cursor where
+                the driver supports one, so memory stays flat with
+                respect to the size of the table.
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        for obj in self.__session.query(cls).yield_per(batch_size):
+            yield obj
+
+    def page(self, cls, limit, after=None, attr=None, value=None):
+        """
+        Returns the objects of a class in id order, starting after an id.
+
+        Args:
+            cls (class or str): The class of the objects to retrieve.
+            limit (int): The maximum number of objects to return.
+            after (str, optional): Only return objects with a greater id.
+            attr (str, optional): Only return objects whose column attr,
+                e.g. "state_id", equals value.
+            value (str, optional): See attr.
+
+        Returns:
+            list: The objects, read with a keyset query
+                WHERE id > :after ORDER BY id LIMIT :limit that walks the
+                primary key, or the foreign key index, from after on.
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        query = self.__session.query(cls)
+        if attr is not None:
+            query = query.filter(getattr(cls, attr) == value)
+        if after is not None:
+            query = query.filter(cls.id > after)
+        return query.order_by(cls.id).limit(limit).all()
+
+    def version(self, cls, attr=None, value=None):
+        """
+        Returns what identifies the current state of the rows of a class,
+        for the ETag and Last-Modified headers of the API.
+
+        Args:
+            cls (class or str): The class of the rows.
+            attr (str, optional): Accepted for FileStorage compatibility;
+                the version always covers every row of the class.
+            value (str, optional): See attr.
+
+        Returns:
+            tuple: A tag that changes with every committed transaction
+                inserting, updating or deleting rows of the class, and
+                the time of the last one, read from the versions table by
+                a single primary key lookup. Until the first write, the
+                time is the greatest updated_at, None without rows.
+        """
+        class_name = cls if isinstance(cls, str) else cls.__name__
+        stamp, modified = self.__session.execute(
+            select(versions.c.stamp, versions.c.updated_at)
+            .where(versions.c.name == class_name)).one()
+        tag = "{}.{}".format(stamp, modified.isoformat() if modified else 0)
+        return tag, modified
+
+    def pool_stats(self):
+        """
+        Reports the state of the connection pool.
+
+        Returns:
+            dict: The pool size, the connections checked in and out, the
+                overflow in use, and the number, total and longest wait of
+                checkouts plus how many timed out. Pools other than
+                TimedQueuePool only report their class.
+        """
+        pool = self.__engine.pool
+        if not isinstance(pool, TimedQueuePool):
+            return {"pool": type(pool).__name__}
+        return {"pool": type(pool).__name__,
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "waits": pool.waits,
+                "wait_time": pool.wait_time,
+                "max_wait": pool.max_wait,
+                "timeouts": pool.timeouts}
@@ -3,9 +3,17 @@
 Contains the FileStorage class
 """
 
+import bisect
+from datetime import datetime
 import json
+import math
+from models.engine import geo, record_file
+from models.engine.fulltext import FullTextIndex, text_keys
+import os
+import threading
+import time
 from models.amenity import Amenity
-from models.base_model import BaseModel
+from models.base_model import BaseModel, format_time, parse_time
 from models.city import City
 from models.place import Place
 from models.review import Review
@@ -15,64 +23,1047 @@ from models.user import User
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
+# foreign key attributes kept in secondary indexes, by class name; a list
+# of ids, like amenity_ids, is indexed under each of its ids
+foreign_keys = {"City": ("state_id",),
+                "Place": ("city_id", "user_id", "amenity_ids"),
+                "Review": ("place_id", "user_id")}
+
+# latitude and longitude attributes kept in a grid index, by class name
+geo_keys = {"Place": ("latitude", "longitude")}
+# size in degrees of the cells of the grid index
+grid_cell = 0.1
+# numeric attributes kept in sorted range indexes, by class name
+range_keys = {"Place": ("price_by_night", "max_guest", "number_rooms",
+                        "number_bathrooms")}
+
+# HBNB_FILE_JOURNAL=1 appends each change to a journal next to the JSON file
+journal = os.getenv("HBNB_FILE_JOURNAL") == "1"
+# number of journal entries after which save() folds them into a snapshot
+compact_after = int(os.getenv("HBNB_FILE_COMPACT_AFTER", "1000"))
+# HBNB_FILE_FSYNC: "always", "never" or a group commit interval in ms
+fsync = os.getenv("HBNB_FILE_FSYNC", "never")
+# HBNB_FILE_LAZY=1 only builds model instances when they are first accessed
+lazy = os.getenv("HBNB_FILE_LAZY") == "1"
+# HBNB_FILE_FORMAT=binary stores a memory-mapped record file instead of JSON
+file_format = os.getenv("HBNB_FILE_FORMAT", "json")
+# HBNB_FILE_CHECK=1 verifies the counts and indexes after every change
+check = os.getenv("HBNB_FILE_CHECK") == "1"
+
 
 class FileStorage:
     """serializes instances to a JSON file & deserializes back to instances"""
 
     # string - path to the JSON file
     __file_path = "file.json"
+    # string - path to the binary record file
+    __bin_path = "file.bin"
+    # string - on-disk format of the snapshot: "json" or "binary"
+    __format = file_format
     # dictionary - empty but will store all objects by <class name>.id
-    __objects = {}
+    __store = {}
+    # dictionary - <class name>.id -> raw record of a not yet built object
+    __raw = {}
+    # dictionary - <class name>.id -> (mmap, offset, length) of a raw record
+    __spans = {}
+    # dictionary - class name -> {<class name>.id: obj or None if raw}
+    __by_class = {}
+    # dictionary - (class name, attribute, value) -> {<class name>.id: obj}
+    __fk_index = {}
+    # dictionary - class name -> sorted list of its keys, built by page()
+    __ordered = {}
+    # dictionary - (class name, grid cell) -> {<class name>.id: obj}
+    __grid = {}
+    # dictionary - (class name, attribute) -> sorted [(value, key)], built
+    # by the first range search on the attribute
+    __ranges = {}
+    # FullTextIndex - text of the objects of text_keys, built by the first
+    # search_text()
+    __fulltext = None
+    # dictionary - class name -> [number of changes, last modified time],
+    # read from __path() + ".versions" by reload(), otherwise started by
+    # version() from the greatest updated_at of the class
+    __versions = {}
+    # bool - __versions changed since they were last written
+    __versions_dirty = False
+    # list - callables told of every write, see subscribe()
+    __listeners = []
+    # dictionary - changes since the last save, <class name>.id -> obj/None
+    __dirty = {}
+    # dictionary - <class name>.id -> JSON text of the last saved to_dict()
+    __encoded = {}
+    # bool - append saves to __file_path + ".journal" instead of rewriting
+    __journal = journal
+    # int - journal entries after which save() writes a snapshot
+    __compact_after = compact_after
+    # int - number of entries in the journal
+    __journal_len = 0
+    # bool - the next save must write a full snapshot
+    __rewrite = False
+    # string - durability policy: "always", "never" or an interval in ms
+    __fsync = fsync
+    # float - time.monotonic() of the last group commit
+    __synced_at = float("-inf")
+    # threading.Timer - pending group commit, if any
+    __sync_timer = None
+    # tuple - on-disk state of the files when last read or written
+    __disk_state = None
+    # bool - reload() keeps raw records and builds objects on first access
+    __lazy = lazy
+    # threading.RLock - held while a raw record is built, see __load()
+    __loading = threading.RLock()
+    # bool - run check_consistency() after every new, delete and reload
+    __check = check
+
+    @property
+    def __objects(self):
+        """dictionary of all objects by <class name>.id"""
+        return FileStorage.__store
+
+    @__objects.setter
+    def __objects(self, objects):
+        """replaces the stored objects and rebuilds the indexes"""
+        FileStorage.__store = objects
+        FileStorage.__raw = {}
+        FileStorage.__spans = {}
+        FileStorage.__by_class = {}
+        FileStorage.__fk_index = {}
+        FileStorage.__ordered = {}
+        FileStorage.__grid = {}
+        FileStorage.__ranges = {}
+        FileStorage.__fulltext = None
+        FileStorage.__dirty = {}
+        FileStorage.__encoded = {}
+        FileStorage.__rewrite = True
+        # any object of any class may have changed
+        for class_name in classes:
+            self.__touch(class_name)
+        for key, obj in objects.items():
+            self.__index(key, obj)
+        self.__written(None)
+
+    @staticmethod
+    def __value(obj, attr):
+        """returns an attribute of an object or of a raw record"""
+        if type(obj) is dict:
+            default = getattr(classes[obj["__class__"]], attr, None)
+            return obj.get(attr, default)
+        return getattr(obj, attr, None)
+
+    @staticmethod
+    def __buckets(class_name, attr, value):
+        """returns the index buckets of a foreign key value or id list"""
+        if type(value) is list:
+            return [(class_name, attr, item) for item in set(value)]
+        return [(class_name, attr, value)]
+
+    def __position(self, obj):
+        """returns the (latitude, longitude) of obj, None if it has none
+        or if it is not a finite one, which has no grid cell"""
+        class_name = (obj["__class__"] if type(obj) is dict
+                      else obj.__class__.__name__)
+        try:
+            position = tuple(float(self.__value(obj, attr))
+                             for attr in geo_keys[class_name])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not all(map(math.isfinite, position)):
+            return None
+        return position
+
+    @staticmethod
+    def __number(value):
+        """returns value as a float, None if it is not a number or is NaN,
+        which would break the order of a range index"""
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return None if math.isnan(number) else number
+
+    def __rank(self, class_name, attr, key, value):
+        """inserts key in a built range index, if value is a number"""
+        values = self.__ranges.get((class_name, attr))
+        number = self.__number(value)
+        if values is not None and number is not None:
+            bisect.insort(values, (number, key))
+
+    def __unrank(self, class_name, attr, key, value):
+        """removes key from a built range index"""
+        values = self.__ranges.get((class_name, attr))
+        number = self.__number(value)
+        if values is not None and number is not None:
+            i = bisect.bisect_left(values, (number, key))
+            if i < len(values) and values[i] == (number, key):
+                del values[i]
+
+    @staticmethod
+    def __cell(class_name, position):
+        """returns the grid index bucket of a position, None if unknown"""
+        if position is None:
+            return None
+        return (class_name, math.floor(position[0] / grid_cell),
+                math.floor(position[1] / grid_cell))
+
+    def __index(self, key, obj):
+        """adds obj or a raw record to its class partition and indexes"""
+        if type(obj) is dict:
+            class_name, entry = obj["__class__"], None
+        else:
+            class_name, entry = obj.__class__.__name__, obj
+        partition = self.__by_class.setdefault(class_name, {})
+        if key not in partition:
+            ordered = self.__ordered.get(class_name)
+            if ordered is not None:
+                bisect.insort(ordered, key)
+            for attr in range_keys.get(class_name, ()):
+                self.__rank(class_name, attr, key, self.__value(obj, attr))
+            if self.__fulltext is not None and class_name in text_keys:
+                self.__fulltext.add(key, self.__text(obj))
+        partition[key] = entry
+        for attr in foreign_keys.get(class_name, ()):
+            for bucket in self.__buckets(class_name, attr,
+                                         self.__value(obj, attr)):
+                self.__fk_index.setdefault(bucket, {})[key] = entry
+        if class_name in geo_keys:
+            cell = self.__cell(class_name, self.__position(obj))
+            if cell is not None:
+                self.__grid.setdefault(cell, {})[key] = entry
+
+    def __unindex(self, key, obj):
+        """removes obj or a raw record from its partition and indexes"""
+        if type(obj) is dict:
+            class_name = obj["__class__"]
+        else:
+            class_name = obj.__class__.__name__
+        self.__by_class.get(class_name, {}).pop(key, None)
+        ordered = self.__ordered.get(class_name)
+        if ordered is not None:
+            i = bisect.bisect_left(ordered, key)
+            if i < len(ordered) and ordered[i] == key:
+                del ordered[i]
+        for attr in range_keys.get(class_name, ()):
+            self.__unrank(class_name, attr, key, self.__value(obj, attr))
+        if self.__fulltext is not None:
+            self.__fulltext.remove(key)
+        for attr in foreign_keys.get(class_name, ()):
+            self.__drop(key, self.__buckets(class_name, attr,
+                                            self.__value(obj, attr)))
+        if class_name in geo_keys:
+            self.__unlocate(key, self.__cell(class_name,
+                                             self.__position(obj)))
+
+    def __unlocate(self, key, cell):
+        """removes key from a grid index cell, deleting it once empty"""
+        objs = self.__grid.get(cell)
+        if objs is not None:
+            objs.pop(key, None)
+            if not objs:
+                del self.__grid[cell]
+
+    def __drop(self, key, buckets):
+        """removes key from index buckets, deleting the emptied ones"""
+        for bucket in buckets:
+            objs = self.__fk_index.get(bucket)
+            if objs is not None:
+                objs.pop(key, None)
+                if not objs:
+                    del self.__fk_index[bucket]
+
+    def __touch(self, class_name):
+        """counts a change to the objects of a class in its version, which
+        the next save() persists"""
+        now = datetime.utcnow()
+        version = self.__versions.setdefault(class_name, [0, None])
+        version[0] += 1
+        version[1] = now if version[1] is None else max(version[1], now)
+        FileStorage.__versions_dirty = True
+
+    def __save_versions(self):
+        """writes the versions to __path() + ".versions" if they changed,
+        through a temporary file renamed over it"""
+        if not self.__versions_dirty:
+            return
+        path = self.__path() + ".versions"
+        with open(path + ".tmp", 'w') as f:
+            json.dump({class_name: [count, modified and format_time(modified)]
+                       for class_name, (count, modified)
+                       in self.__versions.items()}, f)
+            self.__sync(f)
+        os.replace(path + ".tmp", path)
+        FileStorage.__versions_dirty = False
+
+    def __load_versions(self):
+        """reads the versions written by the last save(), of any process"""
+        FileStorage.__versions = {}
+        FileStorage.__versions_dirty = False
+        try:
+            with open(self.__path() + ".versions", 'r') as f:
+                versions = json.load(f)
+        except (OSError, ValueError):
+            return
+        for class_name, (count, modified) in versions.items():
+            self.__versions[class_name] = [
+                count, modified and parse_time(modified)]
+
+    def __written(self, obj, attr=None, old=None):
+        """tells the listeners about a new, changed or deleted obj, or
+        about everything when obj is None"""
+        if not self.__listeners:
+            return
+        if obj is None:
+            for listener in self.__listeners:
+                listener(None, None, [])
+            return
+        class_name = obj.__class__.__name__
+        links = []
+        for name in foreign_keys.get(class_name, ()):
+            values = [getattr(obj, name, None)]
+            if name == attr:
+                values.append(old)
+            for value in values:
+                links.extend(bucket[1:] for bucket in
+                             self.__buckets(class_name, name, value)
+                             if bucket[2] is not None)
+        for listener in self.__listeners:
+            listener(class_name, obj.id, links)
+
+    def __modified(self, class_name):
+        """returns the greatest updated_at of the objects of a class"""
+        values = [self.__value(self.__record(key, entry), "updated_at")
+                  for key, entry in self.__by_class.get(class_name,
+                                                        {}).items()]
+        times = [value for value in values if isinstance(value, datetime)]
+        texts = [value for value in values if isinstance(value, str)]
+        if texts:
+            # the fixed width format sorts like the times it holds
+            times.append(parse_time(max(texts)))
+        return max(times, default=None)
+
+    def __add(self, key, obj):
+        """stores obj under key, replacing any previous object"""
+        old = self.__store.get(key)
+        if old is obj:
+            return
+        if old is None:
+            old = self.__raw.pop(key, None)
+            self.__spans.pop(key, None)
+        if old is not None:
+            self.__unindex(key, old)
+            self.__encoded.pop(key, None)
+        self.__store[key] = obj
+        self.__index(key, obj)
+
+    def __remove(self, key):
+        """drops the object or raw record stored under key, if any"""
+        obj = self.__store.pop(key, None)
+        if obj is None:
+            obj = self.__raw.pop(key, None)
+            self.__spans.pop(key, None)
+        if obj is not None:
+            self.__unindex(key, obj)
+            self.__encoded.pop(key, None)
+
+    def __path(self):
+        """returns the path of the snapshot file for the current format"""
+        if self.__format == "binary":
+            return self.__bin_path
+        return self.__file_path
+
+    def __put(self, key, record):
+        """stores a deserialized record, as a raw record in lazy mode"""
+        if self.__lazy:
+            self.__remove(key)
+            self.__raw[key] = record
+            self.__index(key, record)
+        else:
+            self.__add(key, classes[record["__class__"]](**record))
+
+    def __load(self, key):
+        """builds the object of a raw record and swaps it into the indexes
+
+        Threads serving requests may reach the same record at once: one
+        builds it under the lock, the others return what it built. The
+        object is stored before the record is dropped, so __record()
+        always finds one of them.
+        """
+        with self.__loading:
+            obj = self.__store.get(key)
+            if obj is not None:
+                return obj
+            record = self.__raw[key]
+            span = self.__spans.get(key)
+            if span is not None:
+                record = record_file.record(*span)
+            obj = classes[record["__class__"]](**record)
+            self.__store[key] = obj
+            del self.__raw[key]
+            self.__spans.pop(key, None)
+            self.__index(key, obj)
+            return obj
+
+    def __record(self, key, entry):
+        """returns entry, an object from a class partition or an index,
+        or when it is None the raw record of key, or the object that
+        another thread built from that record meanwhile"""
+        if entry is not None:
+            return entry
+        record = self.__raw.get(key)
+        return record if record is not None else self.__store[key]
+
+    def __built(self, objs):
+        """returns a copy of an index bucket with every raw record built"""
+        return {key: obj if obj is not None else self.__load(key)
+                for key, obj in objs.items()}
+
+    def __encode(self, key, obj):
+        """returns the JSON text of obj, re-encoding it only if dirty"""
+        text = self.__encoded.get(key)
+        if text is None or key in self.__dirty:
+            if type(obj) is dict:
+                text = json.dumps(obj)
+            else:
+                text = obj.to_json()
+            self.__encoded[key] = text
+        return text
 
-    def all(self, cls=None):
-        """returns the dictionary __objects"""
+    def all(self, cls=None, load=None):
+        """returns the dictionary __objects, or only the objects of cls
+
+        load is accepted for compatibility with DBStorage: relationships
+        are already index lookups here.
+        """
         if cls is not None:
-            new_dict = {}
-            for key, value in self.__objects.items():
-                if cls == value.__class__ or cls == value.__class__.__name__:
-                    new_dict[key] = value
-            return new_dict
+            class_name = cls if isinstance(cls, str) else cls.__name__
+            return self.__built(self.__by_class.get(class_name, {}))
+        for key in list(self.__raw):
+            self.__load(key)
         return self.__objects
 
     def new(self, obj):
         """sets in __objects the obj with key <obj class name>.id"""
         if obj is not None:
             key = obj.__class__.__name__ + "." + obj.id
-            self.__objects[key] = obj
+            self.__add(key, obj)
+            self.__dirty[key] = obj
+            self.__touch(obj.__class__.__name__)
+            self.__written(obj)
+            if self.__check:
+                self.check_consistency()
+
+    def bulk_new(self, objs):
+        """
+        Adds several objects and persists them with a single save.
+
+        Args:
+            objs (iterable): The objects to add.
+        """
+        for obj in objs:
+            self.new(obj)
+        self.save()
+
+    def bulk_upsert(self, dicts):
+        """
+        Creates or updates objects from their to_dict() form, saving once.
+
+        Args:
+            dicts (iterable): Dictionaries holding the __class__ of an
+                object and, optionally, its id. The object with that id
+                is updated with the other keys if it exists, otherwise a
+                new object is created from the dictionary.
+        """
+        for values in dicts:
+            cls = classes[values["__class__"]]
+            obj = None
+            if values.get("id") is not None:
+                obj = self.get(cls, values["id"])
+            if obj is None:
+                self.new(cls(**values))
+                continue
+            for key, value in values.items():
+                if key not in ("__class__", "id", "created_at",
+                               "updated_at"):
+                    setattr(obj, key, value)
+            updated_at = values.get("updated_at")
+            if isinstance(updated_at, str):
+                updated_at = parse_time(updated_at)
+            obj.updated_at = updated_at or datetime.utcnow()
+        self.save()
 
     def save(self):
-        """serializes __objects to the JSON file (path: __file_path)"""
-        json_objects = {}
-        for key in self.__objects:
-            json_objects[key] = self.__objects[key].to_dict()
-        with open(self.__file_path, 'w') as f:
-            json.dump(json_objects, f)
+        """serializes __objects to the JSON file (path: __file_path)
 
-    def reload(self):
-        """deserializes the JSON file to __objects"""
+        In journal mode only the objects changed since the last save are
+        appended to the journal, which is folded back into the JSON file
+        once it holds __compact_after entries.
+        """
+        if self.__journal and not self.__rewrite:
+            self.__append()
+            if self.__journal_len < self.__compact_after:
+                return
+        self.compact()
+
+    def compact(self):
+        """writes every object to the snapshot file and empties the journal
+
+        Objects that did not change since the last save are written from
+        their cached JSON text instead of being serialized again. The
+        snapshot goes to a temporary file that is renamed over the JSON
+        file, so a crash never leaves a truncated file behind.
+        """
+        tmp_path = self.__path() + ".tmp"
+        if self.__format == "binary":
+            with open(tmp_path, 'wb') as f:
+                index = record_file.dump(f, self.__records())
+                self.__sync(f)
+        else:
+            parts = []
+            for objs in (self.__store, self.__raw):
+                for key, obj in objs.items():
+                    parts.append(json.dumps(key) + ": " +
+                                 self.__encode(key, obj))
+            with open(tmp_path, 'w') as f:
+                f.write("{" + ", ".join(parts) + "}")
+                self.__sync(f)
+        os.replace(tmp_path, self.__path())
+        if self.__format == "binary":
+            mm = record_file.mapped(self.__path())
+            for key, offset, length, stub in index:
+                if key in self.__spans:
+                    self.__spans[key] = (mm, offset, length)
+        if self.__fsync == "always":
+            self.__sync_dir()
         try:
-            with open(self.__file_path, 'r') as f:
-                jo = json.load(f)
-            for key in jo:
-                self.__objects[key] = classes[jo[key]["__class__"]](**jo[key])
-        except:
+            os.remove(self.__path() + ".journal")
+        except FileNotFoundError:
             pass
+        FileStorage.__journal_len = 0
+        FileStorage.__dirty = {}
+        FileStorage.__rewrite = False
+        self.__save_versions()
+        FileStorage.__disk_state = self.__stat()
+
+    def __stub(self, obj):
+        """returns the class name, updated_at and indexed attributes of obj
+        or a raw record"""
+        if type(obj) is dict:
+            class_name = obj["__class__"]
+        else:
+            class_name = obj.__class__.__name__
+        updated_at = self.__value(obj, "updated_at")
+        if isinstance(updated_at, datetime):
+            updated_at = format_time(updated_at)
+        stub = {"__class__": class_name, "updated_at": updated_at}
+        for attr in (foreign_keys.get(class_name, ()) +
+                     geo_keys.get(class_name, ()) +
+                     range_keys.get(class_name, ())):
+            stub[attr] = self.__value(obj, attr)
+        return stub
+
+    def __records(self):
+        """yields (key, stub, data) for every object, for a record file"""
+        for key, obj in self.__store.items():
+            yield key, self.__stub(obj), self.__encode(key, obj).encode()
+        for key, obj in self.__raw.items():
+            span = self.__spans.get(key)
+            if span is None:
+                data = self.__encode(key, obj).encode()
+            else:
+                mm, offset, length = span
+                data = mm[offset:offset + length]
+            yield key, self.__stub(obj), data
+
+    def __append(self):
+        """appends one journal entry per object changed since the last save"""
+        if not self.__dirty:
+            return
+        lines = []
+        for key, obj in self.__dirty.items():
+            if obj is None:
+                lines.append(json.dumps({"op": "delete", "key": key}))
+            else:
+                lines.append('{{"op": "new", "key": {}, "obj": {}}}'.format(
+                    json.dumps(key), self.__encode(key, obj)))
+        with open(self.__path() + ".journal", 'a') as f:
+            f.write("\n".join(lines) + "\n")
+            self.__sync(f)
+        FileStorage.__journal_len += len(lines)
+        FileStorage.__dirty = {}
+        self.__save_versions()
+        FileStorage.__disk_state = self.__stat()
+
+    def __sync(self, f):
+        """flushes f to disk according to the durability policy"""
+        if self.__fsync == "never":
+            return
+        f.flush()
+        if self.__fsync == "always":
+            os.fsync(f.fileno())
+            return
+        interval = int(self.__fsync) / 1000.0
+        elapsed = time.monotonic() - self.__synced_at
+        if elapsed >= interval:
+            os.fsync(f.fileno())
+            FileStorage.__synced_at = time.monotonic()
+        elif self.__sync_timer is None:
+            timer = threading.Timer(interval - elapsed, self.__group_commit)
+            timer.daemon = True
+            FileStorage.__sync_timer = timer
+            timer.start()
+
+    def __group_commit(self):
+        """fsyncs the files written since the last group commit"""
+        FileStorage.__sync_timer = None
+        for path in (self.__path(), self.__path() + ".journal",
+                     self.__path() + ".versions"):
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        FileStorage.__synced_at = time.monotonic()
+
+    def __sync_dir(self):
+        """fsyncs the directory of the snapshot so a rename is durable"""
+        fd = os.open(os.path.dirname(os.path.abspath(self.__path())),
+                     os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def __replay(self):
+        """applies the journal entries written since the last snapshot
+
+        A last line without its newline was torn by a crash mid-append;
+        it is cut off the journal, so the next entry appended starts on
+        a line of its own instead of being glued to the fragment.
+        """
+        FileStorage.__journal_len = 0
+        path = self.__path() + ".journal"
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        complete = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            complete += len(line)
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry["op"] == "delete":
+                self.__remove(entry["key"])
+            else:
+                self.__put(entry["key"], entry["obj"])
+            FileStorage.__journal_len += 1
+        if complete < len(data):
+            with open(path, 'r+b') as f:
+                f.truncate(complete)
+
+    def reload(self):
+        """deserializes the JSON file and its journal to __objects
+
+        In lazy mode the records are only indexed by key and class; each
+        model instance is built the first time get(), all() or a
+        relationship property reaches it. A binary record file is always
+        read that way: only its index is parsed, and each record is
+        decoded from the memory-mapped file when it is built.
+        """
+        # rebuilt on demand rather than kept sorted one insert at a time
+        FileStorage.__ordered = {}
+        FileStorage.__ranges = {}
+        FileStorage.__fulltext = None
+        self.__load_versions()
+        if self.__format == "binary":
+            self.__reload_binary()
+        else:
+            try:
+                with open(self.__file_path, 'r') as f:
+                    jo = json.load(f)
+                for key in jo:
+                    self.__put(key, jo[key])
+            except:
+                pass
+        self.__replay()
+        FileStorage.__dirty = {key: obj for key, obj in self.__dirty.items()
+                               if self.__store.get(key) is obj}
+        FileStorage.__disk_state = self.__stat()
+        self.__written(None)
+        if self.__check:
+            self.check_consistency()
+
+    def __stat(self):
+        """returns what identifies the current content of the files"""
+        state = []
+        for path in (self.__path(), self.__path() + ".journal",
+                     self.__path() + ".versions"):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                state.append(None)
+            else:
+                state.append((st.st_ino, st.st_size, st.st_mtime_ns))
+        return tuple(state)
+
+    def __reload_binary(self):
+        """indexes the records of the binary record file as raw records"""
+        try:
+            mm, index = record_file.load(self.__path())
+        except FileNotFoundError:
+            return
+        for key, offset, length, stub in index:
+            self.__remove(key)
+            self.__raw[key] = stub
+            self.__spans[key] = (mm, offset, length)
+            self.__index(key, stub)
 
     def delete(self, obj=None):
         """delete obj from __objects if it’s inside"""
         if obj is not None:
             key = obj.__class__.__name__ + '.' + obj.id
             if key in self.__objects:
-                del self.__objects[key]
+                self.__remove(key)
+                self.__dirty[key] = None
+                self.__touch(obj.__class__.__name__)
+                self.__written(obj)
+                if self.__check:
+                    self.check_consistency()
 
     def close(self):
-        """call reload() method for deserializing the JSON file to objects"""
-        self.reload()
+        """call reload() method if the files changed since last read/written
+
+        Objects, and the serializations cached on them, are kept across
+        requests as long as no other process writes to the storage files.
+        """
+        if self.__stat() != self.__disk_state:
+            self.reload()
+
+    def changed(self, obj, attr, old):
+        """marks a stored obj dirty and reindexes a changed foreign key"""
+        class_name = obj.__class__.__name__
+        key = "{}.{}".format(class_name, getattr(obj, "id", None))
+        if self.__store.get(key) is not obj:
+            return
+        self.__dirty[key] = obj
+        self.__touch(class_name)
+        self.__written(obj, attr, old)
+        if attr in text_keys.get(class_name, ()):
+            if self.__fulltext is not None:
+                self.__fulltext.add(key, self.__text(obj))
+            return
+        if attr in range_keys.get(class_name, ()):
+            self.__unrank(class_name, attr, key, old)
+            self.__rank(class_name, attr, key, getattr(obj, attr))
+            return
+        if attr in geo_keys.get(class_name, ()):
+            before = {name: self.__value(obj, name)
+                      for name in geo_keys[class_name]}
+            before.update({attr: old, "__class__": class_name})
+            self.__unlocate(key, self.__cell(class_name,
+                                             self.__position(before)))
+            cell = self.__cell(class_name, self.__position(obj))
+            if cell is not None:
+                self.__grid.setdefault(cell, {})[key] = obj
+            return
+        if attr not in foreign_keys.get(class_name, ()):
+            return
+        self.__drop(key, self.__buckets(class_name, attr, old))
+        for bucket in self.__buckets(class_name, attr, getattr(obj, attr)):
+            self.__fk_index.setdefault(bucket, {})[key] = obj
+
+    def related(self, cls, attr, value):
+        """
+        Returns the objects of a class whose foreign key equals a value.
+
+        Args:
+            cls (class or str): The class of the objects to retrieve.
+            attr (str): The foreign key attribute, e.g. "state_id".
+            value (str): The id the foreign key must point to.
+
+        Returns:
+            list: The matching objects, found through the secondary index.
+        """
+        class_name = cls if isinstance(cls, str) else cls.__name__
+        objs = self.__fk_index.get((class_name, attr, value), {})
+        return list(self.__built(objs).values())
+
+    def iter(self, cls, batch_size=1000):
+        """
+        Yields the objects of a class one by one.
+
+        Args:
+            cls (class or str): The class of the objects to yield.
+            batch_size (int): Accepted for DBStorage compatibility; the
+                objects are already in memory.
+        """
+        class_name = cls if isinstance(cls, str) else cls.__name__
+        for key, obj in list(self.__by_class.get(class_name, {}).items()):
+            if obj is None:
+                obj = self.__load(key) if key in self.__raw else None
+            if obj is not None:
+                yield obj
+
+    def page(self, cls, limit, after=None, attr=None, value=None):
+        """
+        Returns the objects of a class in id order, starting after an id.
+
+        Args:
+            cls (class or str): The class of the objects to retrieve.
+            limit (int): The maximum number of objects to return.
+            after (str, optional): Only return objects with a greater id.
+            attr (str, optional): Only return objects whose attribute attr,
+                e.g. "state_id", equals value.
+            value (str, optional): See attr.
+
+        Returns:
+            list: The objects, found by bisecting the sorted keys of the
+                class or, for a foreign key, of its index bucket.
+        """
+        class_name = cls if isinstance(cls, str) else cls.__name__
+        if attr is None:
+            keys = self.__ordered.get(class_name)
+            if keys is None:
+                keys = sorted(self.__by_class.get(class_name, {}))
+                self.__ordered[class_name] = keys
+            objs = self.__by_class.get(class_name, {})
+        elif attr in foreign_keys.get(class_name, ()):
+            objs = self.__fk_index.get((class_name, attr, value), {})
+            keys = sorted(objs)
+        else:
+            objs = self.all(class_name)
+            keys = sorted(key for key, obj in objs.items()
+                          if getattr(obj, attr, None) == value)
+        start = 0
+        if after is not None:
+            start = bisect.bisect_right(keys, "{}.{}".format(class_name,
+                                                             after))
+        return [objs[key] if objs[key] is not None else self.__load(key)
+                for key in keys[start:start + limit]]
+
+    def search_places(self, states=(), cities=(), amenities=(), near=None,
+                      bbox=None, ranges=None):
+        """
+        Finds the places of some states and cities having some amenities.
+
+        Args:
+            states (list): State ids; their cities are searched.
+            cities (list): City ids whose places are searched as well.
+                With neither states nor cities, every place is searched.
+            amenities (list): Amenity ids a place must all have.
+            near (tuple, optional): (lat, lng, radius_km) of a circle the
+                places must be in.
+            bbox (tuple, optional): (min_lat, min_lng, max_lat, max_lng) of
+                a box the places must be in.
+            ranges (dict, optional): attribute -> (min, max) bounds the
+                numeric attributes of the places must be within; either
+                bound may be None.
+
+        Returns:
+            list: The matching places. They are resolved as unions and
+                intersections of index buckets and sorted range index
+                slices, the smallest first, so no place outside the result
+                is ever looked at.
+        """
+        fk_index = self.__fk_index
+        city_ids = set(cities)
+        for state_id in states:
+            city_ids.update(key.split(".", 1)[1] for key in
+                            fk_index.get(("City", "state_id", state_id), ()))
+        sets = [fk_index.get(("Place", "amenity_ids", amenity_id), {})
+                for amenity_id in set(amenities)]
+        if states or cities:
+            places = {}
+            for city_id in city_ids:
+                places.update(fk_index.get(("Place", "city_id", city_id),
+                                           {}))
+            sets.append(places)
+        if near is not None or bbox is not None:
+            sets.append(self.__located("Place", near, bbox))
+        bounds = sorted(self.__span("Place", attr, low, high)
+                        for attr, (low, high) in (ranges or {}).items())
+        if not sets and not bounds:
+            return list(self.all("Place").values())
+        sets.sort(key=len)
+        if bounds and (not sets or bounds[0][0] < len(sets[0])):
+            size, attr, low, high, values, lo = bounds.pop(0)
+            keys = [values[i][1] for i in range(lo, lo + size)]
+        else:
+            keys = list(sets.pop(0))
+        for objs in sets:
+            keys = [key for key in keys if key in objs]
+        partition = self.__by_class.get("Place", {})
+        for size, attr, low, high, values, lo in bounds:
+            keys = [key for key in keys if self.__between(
+                self.__record(key, partition[key]), attr, low, high)]
+        return [partition[key] if partition[key] is not None
+                else self.__load(key) for key in keys]
+
+    def __span(self, class_name, attr, low, high):
+        """
+        Finds the objects of class_name whose attr is in [low, high] in
+        its range index, building the index on first use.
+
+        Returns:
+            tuple: (count, attr, low, high, index, start) where the count
+                entries of the index from start are the matching ones.
+        """
+        values = self.__ranges.get((class_name, attr))
+        if values is None:
+            values = []
+            for key, entry in self.__by_class.get(class_name, {}).items():
+                number = self.__number(self.__value(
+                    self.__record(key, entry), attr))
+                if number is not None:
+                    values.append((number, key))
+            values.sort()
+            self.__ranges[(class_name, attr)] = values
+        lo, hi = 0, len(values)
+        if low is not None:
+            lo = bisect.bisect_left(values, (low,))
+        if high is not None:
+            hi = bisect.bisect_left(values, (math.nextafter(high, math.inf),))
+        return max(hi - lo, 0), attr, low, high, values, lo
+
+    def __between(self, obj, attr, low, high):
+        """tells whether the attr of obj or a raw record is in [low, high]"""
+        number = self.__number(self.__value(obj, attr))
+        return (number is not None and (low is None or number >= low) and
+                (high is None or number <= high))
+
+    def __text(self, obj):
+        """returns the indexed text of obj or of a raw record"""
+        class_name = (obj["__class__"] if type(obj) is dict
+                      else obj.__class__.__name__)
+        return " ".join(value for value in (
+            self.__value(obj, attr) for attr in text_keys[class_name])
+            if isinstance(value, str))
+
+    def search_text(self, query, limit=20, offset=0):
+        """
+        Ranks the places and reviews whose text matches a query.
+
+        Args:
+            query (str): The words to look for in Place.description and
+                Review.text.
+            limit (int): The maximum number of objects to return.
+            offset (int): The number of best matches to skip.
+
+        Returns:
+            list: The objects, best BM25 score first. The index is built
+                on the first search and then updated by new(), delete()
+                and every change to an indexed attribute.
+        """
+        if self.__fulltext is None:
+            fulltext = FullTextIndex()
+            for class_name in text_keys:
+                for key, entry in self.__by_class.get(class_name,
+                                                      {}).items():
+                    if entry is None:
+                        span = self.__spans.get(key)
+                        if span is not None:
+                            entry = record_file.record(*span)
+                        else:
+                            entry = self.__record(key, None)
+                    fulltext.add(key, self.__text(entry))
+            FileStorage.__fulltext = fulltext
+        return [self.__store.get(key) or self.__load(key)
+                for key, score in self.__fulltext.search(query, limit,
+                                                         offset)]
+
+    def __located(self, class_name, near, bbox):
+        """returns the objects of class_name in a circle and box, by key"""
+        box = bbox
+        if near is not None:
+            box = geo.bounds(*near)
+            if bbox is not None:
+                box = (max(box[0], bbox[0]), max(box[1], bbox[1]),
+                       min(box[2], bbox[2]), min(box[3], bbox[3]))
+        low = self.__cell(class_name, box[:2])
+        high = self.__cell(class_name, box[2:])
+        cells = (high[1] - low[1] + 1) * (high[2] - low[2] + 1)
+        if cells > len(self.__grid):
+            candidates = [objs for cell, objs in self.__grid.items()
+                          if cell[0] == class_name and
+                          low[1] <= cell[1] <= high[1] and
+                          low[2] <= cell[2] <= high[2]]
+        else:
+            candidates = [self.__grid.get((class_name, i, j), {})
+                          for i in range(low[1], high[1] + 1)
+                          for j in range(low[2], high[2] + 1)]
+        found = {}
+        for objs in candidates:
+            for key, entry in objs.items():
+                position = self.__position(self.__record(key, entry))
+                if geo.within(*position, near=near, bbox=bbox):
+                    found[key] = entry
+        return found
+
+    def check_consistency(self):
+        """
+        Recomputes the per-class counts and the foreign key, grid, order
+        and range indexes from the stored objects and compares them with
+        the maintained ones.
+
+        Raises:
+            AssertionError: If a maintained structure drifted.
+        """
+        shared = set(self.__store) & set(self.__raw)
+        if shared:
+            raise AssertionError("built and raw: {}".format(sorted(shared)))
+        by_class = {}
+        fk_index = {}
+        grid = {}
+        for objs in (self.__store, self.__raw):
+            for key, obj in objs.items():
+                if type(obj) is dict:
+                    class_name, entry = obj["__class__"], None
+                else:
+                    class_name, entry = obj.__class__.__name__, obj
+                by_class.setdefault(class_name, {})[key] = entry
+                for attr in foreign_keys.get(class_name, ()):
+                    for bucket in self.__buckets(class_name, attr,
+                                                 self.__value(obj, attr)):
+                        fk_index.setdefault(bucket, {})[key] = entry
+                if class_name in geo_keys:
+                    cell = self.__cell(class_name, self.__position(obj))
+                    if cell is not None:
+                        grid.setdefault(cell, {})[key] = entry
+        for name in set(by_class) | set(self.__by_class):
+            if by_class.get(name, {}) != self.__by_class.get(name, {}):
+                raise AssertionError("{} count: {} maintained, {} stored"
+                                     .format(name, self.count(name),
+                                             len(by_class.get(name, {}))))
+        for bucket in set(fk_index) | set(self.__fk_index):
+            if fk_index.get(bucket, {}) != self.__fk_index.get(bucket, {}):
+                raise AssertionError("stale index {}".format(bucket))
+        if grid != self.__grid:
+            raise AssertionError("stale grid index")
+        for name, keys in self.__ordered.items():
+            if keys != sorted(by_class.get(name, {})):
+                raise AssertionError("stale order of {}".format(name))
+        for (name, attr), values in self.__ranges.items():
+            numbers = []
+            for key, entry in by_class.get(name, {}).items():
+                number = self.__number(self.__value(
+                    self.__record(key, entry), attr))
+                if number is not None:
+                    numbers.append((number, key))
+            if values != sorted(numbers):
+                raise AssertionError("stale range index {}.{}".format(
+                    name, attr))
 
     def count(self, cls=None):
         """
         Returns the number of objects in storage for a given class.
         If no class is specified, returns the total count of all objects.
+        Both are read from the maintained class partitions in O(1).
 
         Args:
             cls (class or str, optional): The class for which to count objects.
@@ -81,21 +1072,88 @@ class FileStorage:
             int: The number of objects in storage for the specified class.
         """
         if cls:
-            return len(self.all(cls))
+            class_name = cls if isinstance(cls, str) else cls.__name__
+            return len(self.__by_class.get(class_name, {}))
         else:
-            return len(self.__objects)
+            return len(self.__store) + len(self.__raw)
 
-    def get(self, cls, id):
+    def count_many(self, clss=None, approximate=False):
+        """
+        Returns the number of objects of several classes.
+
+        Args:
+            clss (list, optional): Classes or class names, all by default.
+            approximate (bool): Accepted for DBStorage compatibility; the
+                counts of FileStorage are always exact.
+
+        Returns:
+            dict: The number of objects by class name.
+        """
+        names = [c if isinstance(c, str) else c.__name__
+                 for c in (clss or classes)]
+        return {name: self.count(name) for name in names}
+
+    def subscribe(self, listener):
+        """
+        Registers a callable to tell about every write to the storage,
+        e.g. to invalidate cached API responses.
+
+        Args:
+            listener (callable): Called as listener(class_name, id, links)
+                for every new, changed or deleted object, links being the
+                (foreign key attribute, id) pairs of the object, before
+                and after a change of one of them. A class_name of None
+                means that every object may have changed, as after
+                reload().
+        """
+        self.__listeners.append(listener)
+
+    def version(self, cls, attr=None, value=None):
+        """
+        Returns what identifies the current state of the objects of a
+        class, for the ETag and Last-Modified headers of the API.
+
+        Args:
+            cls (class or str): The class of the objects.
+            attr (str, optional): Accepted for DBStorage compatibility;
+                the version always covers every object of the class.
+            value (str, optional): See attr.
+
+        Returns:
+            tuple: A tag that changes with every new, changed or deleted
+                object of the class, and the time of the last change.
+                Both are saved with the objects, so they survive a
+                reload and match between processes reading the same
+                files. Until a change is saved, the time is the greatest
+                updated_at, None for a class without objects.
+        """
+        class_name = cls if isinstance(cls, str) else cls.__name__
+        version = self.__versions.get(class_name)
+        if version is None:
+            version = [0, self.__modified(class_name)]
+            self.__versions[class_name] = version
+        count, modified = version
+        return "{}.{}".format(count, format_time(modified)
+                              if modified else 0), modified
+
+    def get(self, cls, id, load=None):
         """
         Retrieve a single object from storage by its class and ID.
 
         Args:
             cls (class or str): The class of the object to retrieve.
             id (str): The ID of the object to retrieve.
+            load (list, optional): Ignored, see all().
 
         Returns:
             object or None: The object with the specified class and ID, None.
         """
         class_name = cls if isinstance(cls, str) else cls.__name__
         key = "{}.{}".format(class_name, id)
-        return self.__objects.get(key)
+        if key in self.__raw:
+            return self.__load(key)
+        return self.__store.get(key)
+
+    def pool_stats(self):
+        """FileStorage has no connection pool, see DBStorage.pool_stats"""
+        return {}
@@ -0,0 +1,144 @@
+#!/usr/bin/python3
+"""
+Contains the FullTextIndex class, a BM25 ranked inverted index over the
+text attributes of stored objects
+"""
+
+from array import array
+from collections import Counter
+import heapq
+import math
+from operator import itemgetter
+import re
+
+# text attributes indexed for full-text search, by class name
+text_keys = {"Place": ("description",), "Review": ("text",)}
+
+word = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """returns the lowercase words of a text"""
+    if not isinstance(text, str):
+        return []
+    return word.findall(text.lower())
+
+
+class FullTextIndex:
+    """
+    Inverted index of documents identified by key, usually the
+    <class name>.id of an object.
+
+    Each term maps to a postings list: an array of document numbers and
+    an array of term frequencies. Removing a document only marks its
+    number dead. The postings are compacted once the dead documents
+    reach a quarter of the indexed ones; until then the document
+    frequencies used for ranking include them.
+    """
+
+    # BM25 term frequency saturation and length normalization
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        """Instantiate an empty index"""
+        # list - document number -> key, None once removed
+        self.keys = []
+        # array - document number -> number of terms
+        self.lengths = array("L")
+        # dictionary - key -> document number
+        self.numbers = {}
+        # dictionary - term -> (document numbers, term frequencies)
+        self.postings = {}
+        # int - number of terms of the live documents
+        self.total = 0
+
+    def __len__(self):
+        """returns the number of live documents"""
+        return len(self.numbers)
+
+    def add(self, key, text):
+        """indexes the text of a document, replacing its previous text"""
+        self.remove(key)
+        terms = tokenize(text)
+        if not terms:
+            return
+        number = len(self.keys)
+        self.keys.append(key)
+        self.lengths.append(len(terms))
+        self.numbers[key] = number
+        self.total += len(terms)
+        for term, frequency in Counter(terms).items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = (array("L"), array("H"))
+            postings[0].append(number)
+            postings[1].append(min(frequency, 0xffff))
+
+    def remove(self, key):
+        """removes a document from the index, if it is indexed"""
+        number = self.numbers.pop(key, None)
+        if number is None:
+            return
+        self.keys[number] = None
+        self.total -= self.lengths[number]
+        dead = len(self.keys) - len(self.numbers)
+        if dead > max(len(self.keys) // 4, 1000):
+            self.compact()
+
+    def compact(self):
+        """drops the dead documents and renumbers the live ones"""
+        renumbered = array("L", [0] * len(self.keys))
+        keys = []
+        lengths = array("L")
+        for number, key in enumerate(self.keys):
+            if key is not None:
+                renumbered[number] = len(keys)
+                keys.append(key)
+                lengths.append(self.lengths[number])
+        postings = {}
+        for term, (numbers, frequencies) in self.postings.items():
+            live = [(renumbered[number], frequency)
+                    for number, frequency in zip(numbers, frequencies)
+                    if self.keys[number] is not None]
+            if live:
+                postings[term] = (array("L", map(itemgetter(0), live)),
+                                  array("H", map(itemgetter(1), live)))
+        self.keys = keys
+        self.lengths = lengths
+        self.numbers = {key: number for number, key in enumerate(keys)}
+        self.postings = postings
+
+    def search(self, query, limit, offset=0):
+        """
+        Ranks the documents matching any term of a query with BM25.
+
+        Args:
+            query (str): The words to look for.
+            limit (int): The maximum number of documents to return.
+            offset (int): The number of best documents to skip.
+
+        Returns:
+            list: (key, score) tuples, best score first.
+        """
+        count = len(self.numbers)
+        if not count:
+            return []
+        average = self.total / count
+        keys, lengths, k1, b = self.keys, self.lengths, self.k1, self.b
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            frequency = len(postings[0])
+            idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for number, tf in zip(*postings):
+                if keys[number] is None:
+                    continue
+                norm = k1 * (1 - b + b * lengths[number] / average)
+                scores[number] = (scores.get(number, 0.0) +
+                                  idf * tf * (k1 + 1) / (tf + norm))
+        best = heapq.nlargest(offset + limit, scores.items(),
+                              key=itemgetter(1))
+        return [(keys[number], score) for number, score in best[offset:]]
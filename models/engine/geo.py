@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+"""
+Distance and bounding box helpers for the geo search of places
+"""
+
+import math
+
+# mean radius of the Earth in kilometers
+earth_radius = 6371.0088
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """returns the great-circle distance in km between two points"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * earth_radius * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounds(lat, lng, radius_km):
+    """
+    Returns the bounding box of a circle on the Earth.
+
+    Args:
+        lat (float): The latitude of the center, in degrees.
+        lng (float): The longitude of the center, in degrees.
+        radius_km (float): The radius of the circle.
+
+    Returns:
+        tuple: (min_lat, min_lng, max_lat, max_lng) of a box holding every
+            point within radius_km of the center. Near a pole, or across
+            the antimeridian, the box spans every longitude.
+    """
+    dlat = math.degrees(radius_km / earth_radius)
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    if min_lat == -90.0 or max_lat == 90.0:
+        return min_lat, -180.0, max_lat, 180.0
+    dlng = math.degrees(math.asin(min(1.0, math.sin(math.radians(dlat)) /
+                                      math.cos(math.radians(lat)))))
+    if lng - dlng < -180.0 or lng + dlng > 180.0:
+        return min_lat, -180.0, max_lat, 180.0
+    return min_lat, lng - dlng, max_lat, lng + dlng
+
+
+def within(lat, lng, near=None, bbox=None):
+    """
+    Tells whether a point is in a circle and in a bounding box.
+
+    Args:
+        lat (float): The latitude of the point, None if unknown.
+        lng (float): The longitude of the point, None if unknown.
+        near (tuple, optional): (lat, lng, radius_km) of the circle.
+        bbox (tuple, optional): (min_lat, min_lng, max_lat, max_lng).
+
+    Returns:
+        bool: True if the point is in both, when given.
+    """
+    if lat is None or lng is None:
+        return False
+    if bbox is not None:
+        if not (bbox[0] <= lat <= bbox[2] and bbox[1] <= lng <= bbox[3]):
+            return False
+    if near is not None:
+        return haversine(near[0], near[1], lat, lng) <= near[2]
+    return True
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+"""
+Reads and writes the binary record file used by FileStorage
+
+The file starts with an 8 byte magic number and the offset of the index,
+followed by one UTF-8 JSON record per object and, at the end, the index:
+a JSON array of [key, offset, length, stub] entries. A stub holds the
+class name and the foreign keys of a record, which is all FileStorage
+needs to index it without decoding the record itself.
+"""
+
+import json
+import mmap
+import struct
+
+MAGIC = b"HBNBREC1"
+header = struct.Struct("<8sQ")
+
+
+def dump(f, records):
+    """
+    Writes records to a binary file opened for writing.
+
+    Args:
+        f (file): The binary file to write to.
+        records (iterable): (key, stub, data) tuples, data being the
+            encoded JSON of the record.
+
+    Returns:
+        list: The [key, offset, length, stub] index entries written.
+    """
+    f.write(header.pack(MAGIC, 0))
+    offset = header.size
+    index = []
+    for key, stub, data in records:
+        f.write(data)
+        index.append([key, offset, len(data), stub])
+        offset += len(data)
+    f.write(json.dumps(index).encode())
+    f.seek(0)
+    f.write(header.pack(MAGIC, offset))
+    return index
+
+
+def mapped(path):
+    """maps a binary record file into memory, read-only"""
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(MAGIC)] != MAGIC:
+        raise ValueError("{} is not a record file".format(path))
+    return mm
+
+
+def load(path):
+    """
+    Maps a binary record file into memory and reads its index.
+
+    Args:
+        path (str): The path of the record file.
+
+    Returns:
+        tuple: The read-only mmap and its [key, offset, length, stub]
+            index entries. Records are decoded with record(mm, ...).
+    """
+    mm = mapped(path)
+    index_offset = header.unpack_from(mm)[1]
+    return mm, json.loads(mm[index_offset:])
+
+
+def record(mm, offset, length):
+    """decodes the record stored at offset in a mapped record file"""
+    return json.loads(mm[offset:offset + length])
@@ -4,7 +4,8 @@ import models
 from models.base_model import BaseModel, Base
 from os import getenv
 import sqlalchemy
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, Table
+from sqlalchemy import (Column, String, Integer, Float, ForeignKey, Index,
+                        Table)
 from sqlalchemy.orm import relationship
 
 if models.storage_t == 'db':
@@ -16,13 +17,24 @@ if models.storage_t == 'db':
                           Column('amenity_id', String(60),
                                  ForeignKey('amenities.id', onupdate='CASCADE',
                                             ondelete='CASCADE'),
-                                 primary_key=True))
+                                 primary_key=True),
+                          # amenity -> places lookups for /places_search
+                          Index('ix_place_amenity_amenity_id',
+                                'amenity_id', 'place_id'))
 
 
 class Place(BaseModel, Base):
     """Representation of Place """
     if models.storage_t == 'db':
         __tablename__ = 'places'
+        # range scans for the geo and numeric filters of /places_search
+        __table_args__ = (Index('ix_places_latitude_longitude',
+                                'latitude', 'longitude'),
+                          Index('ix_places_price_by_night', 'price_by_night'),
+                          Index('ix_places_max_guest', 'max_guest'),
+                          Index('ix_places_number_rooms', 'number_rooms'),
+                          Index('ix_places_number_bathrooms',
+                                'number_bathrooms'))
         city_id = Column(String(60), ForeignKey('cities.id'), nullable=False)
         user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
         name = Column(String(128), nullable=False)
@@ -58,21 +70,15 @@ class Place(BaseModel, Base):
         @property
         def reviews(self):
             """getter attribute returns the list of Review instances"""
-            from models.review import Review
-            review_list = []
-            all_reviews = models.storage.all(Review)
-            for review in all_reviews.values():
-                if review.place_id == self.id:
-                    review_list.append(review)
-            return review_list
+            return models.storage.related("Review", "place_id", self.id)
 
         @property
         def amenities(self):
             """getter attribute returns the list of Amenity instances"""
             from models.amenity import Amenity
             amenity_list = []
-            all_amenities = models.storage.all(Amenity)
-            for amenity in all_amenities.values():
-                if amenity.place_id == self.id:
+            for amenity_id in self.amenity_ids:
+                amenity = models.storage.get(Amenity, amenity_id)
+                if amenity is not None:
                     amenity_list.append(amenity)
             return amenity_list
@@ -26,8 +26,4 @@ class State(BaseModel, Base):
         @property
         def cities(self):
             """ Getter for list of city instances related to the state """
-            return [
-            city 
-            for city in models.storage.all(City).values() 
-            if city.state_id == self.id
-        ]
+            return models.storage.related(City, "state_id", self.id)
@@ -36,3 +36,14 @@ class User(BaseModel, Base):
     def update_password(self, new_password):
         """Update password method"""
         self.password = hashlib.md5(new_password.encode()).hexdigest()
+
+    if models.storage_t != 'db':
+        @property
+        def places(self):
+            """getter attribute returns the list of Place instances"""
+            return models.storage.related("Place", "user_id", self.id)
+
+        @property
+        def reviews(self):
+            """getter attribute returns the list of Review instances"""
+            return models.storage.related("Review", "user_id", self.id)
@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+"""
+Contains the TestResponseCacheDocs and TestResponseCache classes
+"""
+
+from api.v1 import cache
+import inspect
+import pep8
+import unittest
+from unittest.mock import patch
+ResponseCache = cache.ResponseCache
+
+
+class TestResponseCacheDocs(unittest.TestCase):
+    """Tests to check the documentation and style of ResponseCache class"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.cache_f = inspect.getmembers(ResponseCache, inspect.isfunction)
+
+    def test_pep8_conformance_cache(self):
+        """Test that api/v1/cache.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['api/v1/cache.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_cache(self):
+        """Test that tests/test_api/test_v1/test_cache.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_api/test_v1/test_cache.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_cache_module_docstring(self):
+        """Test for the cache.py module docstring"""
+        self.assertIsNot(cache.__doc__, None,
+                         "cache.py needs a docstring")
+        self.assertTrue(len(cache.__doc__) >= 1,
+                        "cache.py needs a docstring")
+
+    def test_cache_class_docstring(self):
+        """Test for the ResponseCache class docstring"""
+        self.assertIsNot(ResponseCache.__doc__, None,
+                         "ResponseCache class needs a docstring")
+        self.assertTrue(len(ResponseCache.__doc__) >= 1,
+                        "ResponseCache class needs a docstring")
+
+    def test_cache_func_docstrings(self):
+        """Test for the presence of docstrings in ResponseCache methods"""
+        for func in self.cache_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+            self.assertTrue(len(func[1].__doc__) >= 1,
+                            "{:s} method needs a docstring".format(func[0]))
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test the ResponseCache class"""
+
+    def setUp(self):
+        """Create a cache of 800 bytes, entries of up to 100"""
+        self.cache = ResponseCache(800, 0)
+        self.headers = [("ETag", '"1"')]
+
+    def put(self, key, body=b"x" * 100, tags=("State",)):
+        """caches body under key, returns whether it was stored"""
+        return self.cache.put(key, self.cache.generation(), body,
+                              self.headers, list(tags))
+
+    def test_hit_and_miss(self):
+        """Test that get() returns what put() stored, None otherwise"""
+        self.assertIsNone(self.cache.get("/states"))
+        self.assertTrue(self.put("/states", b"[]"))
+        self.assertEqual(self.cache.get("/states"), (b"[]", self.headers))
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual((stats["entries"], stats["bytes"]), (1, 2))
+
+    def test_ttl(self):
+        """Test that an entry expires after the time to live"""
+        self.cache.ttl = 60
+        with patch("api.v1.cache.time") as clock:
+            clock.monotonic.return_value = 1000.0
+            self.put("/states")
+            clock.monotonic.return_value = 1059.0
+            self.assertIsNotNone(self.cache.get("/states"))
+            clock.monotonic.return_value = 1061.0
+            self.assertIsNone(self.cache.get("/states"))
+        stats = self.cache.stats()
+        self.assertEqual((stats["expired"], stats["entries"]), (1, 0))
+
+    def test_no_ttl(self):
+        """Test that a time to live of 0 keeps entries"""
+        with patch("api.v1.cache.time") as clock:
+            clock.monotonic.return_value = 0.0
+            self.put("/states")
+            clock.monotonic.return_value = 1e9
+            self.assertIsNotNone(self.cache.get("/states"))
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entries make room"""
+        for i in range(8):
+            self.assertTrue(self.put("/states/{}".format(i)))
+        self.assertIsNotNone(self.cache.get("/states/0"))
+        self.put("/states/8")
+        self.assertIsNone(self.cache.get("/states/1"))
+        for i in (0, 2, 8):
+            self.assertIsNotNone(self.cache.get("/states/{}".format(i)))
+        stats = self.cache.stats()
+        self.assertEqual((stats["evicted"], stats["bytes"]), (1, 800))
+
+    def test_replace(self):
+        """Test that putting a key again replaces its entry"""
+        self.put("/states", b"old")
+        self.put("/states", b"new!")
+        self.assertEqual(self.cache.get("/states")[0], b"new!")
+        self.assertEqual(self.cache.stats()["bytes"], 4)
+
+    def test_oversized(self):
+        """Test that a body over an eighth of the cache is not cached"""
+        self.assertFalse(self.put("/states", b"x" * 101))
+        self.assertIsNone(self.cache.get("/states"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_disabled(self):
+        """Test that a cache of 0 bytes stores nothing"""
+        self.cache = ResponseCache(0, 0)
+        self.assertFalse(self.put("/states", b"[]"))
+
+    def test_stale_generation(self):
+        """Test that a response built across a write is not stored"""
+        generation = self.cache.generation()
+        self.cache.invalidate("State", None, [])
+        self.assertFalse(self.cache.put("/states", generation, b"[]",
+                                        self.headers, ["State"]))
+        self.assertIsNone(self.cache.get("/states"))
+
+    def test_invalidate(self):
+        """Test that a write drops the entries of its class, id and
+        parents, and only those"""
+        self.put("/states", tags=["State"])
+        self.put("/states/1", tags=["State:1"])
+        self.put("/states/2", tags=["State:2"])
+        self.put("/states/1/cities", tags=["City:state_id:1"])
+        self.put("/states/2/cities", tags=["City:state_id:2"])
+        self.put("/amenities", tags=["Amenity"])
+        self.cache.invalidate("State", "1", [])
+        self.assertIsNone(self.cache.get("/states"))
+        self.assertIsNone(self.cache.get("/states/1"))
+        self.assertIsNotNone(self.cache.get("/states/2"))
+        self.cache.invalidate("City", "9", [("state_id", "1")])
+        self.assertIsNone(self.cache.get("/states/1/cities"))
+        self.assertIsNotNone(self.cache.get("/states/2/cities"))
+        self.cache.invalidate("City", None, [])
+        self.assertIsNone(self.cache.get("/states/2/cities"))
+        self.assertIsNotNone(self.cache.get("/amenities"))
+        self.cache.invalidate(None, None, [])
+        self.assertEqual(self.cache.stats()["entries"], 0)
+        self.assertEqual(self.cache.stats()["invalidated"], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
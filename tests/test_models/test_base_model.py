@@ -2,8 +2,12 @@
 """Test BaseModel for expected behavior and documentation"""
 from datetime import datetime
 import inspect
+import json
 import models
+import os
 import pep8 as pycodestyle
+import subprocess
+import sys
 import time
 import unittest
 from unittest import mock
@@ -144,6 +148,71 @@ class TestBaseModel(unittest.TestCase):
         string = "[BaseModel] ({}) {}".format(inst.id, inst.__dict__)
         self.assertEqual(string, str(inst))
 
+    def test_parse_time(self):
+        """parse_time matches strptime, including the fallback path"""
+        t_format = "%Y-%m-%dT%H:%M:%S.%f"
+        for value in ["2017-09-28T21:03:54.052302",
+                      "2017-09-28T21:03:54.000000",
+                      "2017-09-28T21:03:54.05"]:
+            with self.subTest(value=value):
+                self.assertEqual(models.base_model.parse_time(value),
+                                 datetime.strptime(value, t_format))
+        for value in ["2017-09-28T21:03:54", "2017-09-28T21:03:54,052302"]:
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    models.base_model.parse_time(value)
+
+    def test_format_time(self):
+        """format_time matches strftime"""
+        t_format = "%Y-%m-%dT%H:%M:%S.%f"
+        for value in [datetime(2017, 9, 28, 21, 3, 54, 52302),
+                      datetime(2017, 9, 28, 21, 3, 54)]:
+            with self.subTest(value=value):
+                self.assertEqual(models.base_model.format_time(value),
+                                 value.strftime(t_format))
+
+    @unittest.skipIf(models.storage_t == "db", "file-mode only")
+    def test_to_dict_cached(self):
+        """to_dict() and to_json() are cached until an attribute changes"""
+        inst = BaseModel()
+        with mock.patch("models.base_model.format_time",
+                        side_effect=models.base_model.format_time) as fmt:
+            first = inst.to_dict()
+            text = inst.to_json()
+            self.assertEqual(inst.to_dict(), first)
+            self.assertEqual(fmt.call_count, 2)
+            inst.name = "Holberton"
+            self.assertEqual(inst.to_dict()["name"], "Holberton")
+            self.assertEqual(fmt.call_count, 4)
+        self.assertNotEqual(inst.to_json(), text)
+        self.assertEqual(json.loads(inst.to_json()), inst.to_dict())
+
+    def test_to_dict_copy(self):
+        """Changing a returned dictionary does not change the cache"""
+        inst = BaseModel()
+        inst.to_dict()["id"] = "changed"
+        self.assertEqual(inst.to_dict()["id"], inst.id)
+
+    @unittest.skipIf(models.storage_t == "db", "file-mode only")
+    def test_compact_models(self):
+        """Compact models keep their fields in slots, not in a __dict__"""
+        script = "\n".join([
+            "from models.state import State",
+            "state = State(name='California')",
+            "state.motto = 'Eureka'",
+            "assert type(state).__dictoffset__ == 0",
+            "assert State().name == ''",
+            "d = state.to_dict()",
+            "assert d['name'] == 'California' and d['motto'] == 'Eureka'",
+            "assert State(**d).to_dict() == d",
+            "assert str(state).startswith('[State] (' + state.id + ')')",
+        ])
+        env = dict(os.environ, HBNB_COMPACT_MODELS="1")
+        env.pop("HBNB_TYPE_STORAGE", None)
+        result = subprocess.run([sys.executable, "-c", script], env=env,
+                                stderr=subprocess.PIPE)
+        self.assertEqual(result.returncode, 0, result.stderr.decode())
+
     @mock.patch('models.storage')
     def test_save(self, mock_storage):
         """Test that save method updates `updated_at` and calls
@@ -8,6 +8,8 @@ import inspect
 import models
 from models.base_model import BaseModel
 from models.city import City
+from models.state import State
+import os
 import pep8
 import unittest
 
@@ -115,3 +117,41 @@ class TestCity(unittest.TestCase):
         city = City()
         string = "[City] ({}) {}".format(city.id, city.__dict__)
         self.assertEqual(string, str(city))
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestCityAPI(unittest.TestCase):
+    """Tests for the conditional requests of /api/v1/cities"""
+
+    def setUp(self):
+        """Empty the storage and create a test client"""
+        from api.v1.app import app
+        models.storage._FileStorage__objects = {}
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """Remove storage file at end of tests"""
+        try:
+            os.remove("file.json")
+        except Exception:
+            pass
+
+    def test_put_changes_etag(self):
+        """A PUT makes the ETag of the City it updated stale"""
+        state = State(name="California")
+        city = City(name="Fremont", state_id=state.id)
+        models.storage.new(state)
+        models.storage.new(city)
+        models.storage.save()
+        url = "/api/v1/cities/" + city.id
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.put(url, json={"name": "San Jose"})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.json["name"], "San Jose")
@@ -17,7 +17,9 @@ from models.user import User
 import json
 import os
 import pep8
+import tempfile
 import unittest
+from unittest import mock
 DBStorage = db_storage.DBStorage
 classes = {"Amenity": Amenity, "City": City, "Place": Place,
            "Review": Review, "State": State, "User": User}
@@ -98,5 +100,367 @@ class TestFileStorage(unittest.TestCase):
         """Test that save properly saves objects to file.json"""
 
     @unittest.skipIf(os.getenv("HBNB_TYPE_STORAGE") != "db",
-                                                       "db_storage test"
-                                                       "not supported",)
+                     "db_storage test not supported")
+    def test_count(self):
+        """Test that count returns the number of rows of a class"""
+        count = models.storage.count(State)
+        models.storage.new(State(name="Nevada"))
+        models.storage.save()
+        self.assertEqual(models.storage.count(State), count + 1)
+        self.assertEqual(models.storage.count("State"), count + 1)
+
+
+class TestDBStorageEngine(unittest.TestCase):
+    """Tests for the engines and pools of DBStorage, on SQLite"""
+
+    def setUp(self):
+        """Create a directory for the database files"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.url = "sqlite:///" + os.path.join(self.directory.name, "hbnb.db")
+
+    def test_memory_static_pool(self):
+        """Test that in-memory SQLite shares one connection"""
+        engine = db_storage.engine("sqlite://")
+        self.addCleanup(engine.dispose)
+        self.assertIsInstance(engine.pool, db_storage.StaticPool)
+        with engine.connect() as connection:
+            connection.execute(db_storage.text("CREATE TABLE t (x)"))
+            connection.commit()
+        with engine.connect() as connection:
+            self.assertEqual(connection.scalar(db_storage.text(
+                "SELECT count(*) FROM t")), 0)
+
+    def test_pragmas(self):
+        """Test that SQLite connections run the configured PRAGMAs"""
+        with mock.patch.object(db_storage, "sqlite_pragmas",
+                               "foreign_keys=ON, journal_mode=WAL"):
+            engine = db_storage.engine(self.url)
+        self.addCleanup(engine.dispose)
+        with engine.connect() as connection:
+            self.assertEqual(connection.scalar(db_storage.text(
+                "PRAGMA foreign_keys")), 1)
+            self.assertEqual(connection.scalar(db_storage.text(
+                "PRAGMA journal_mode")), "wal")
+
+    def test_timed_queue_pool(self):
+        """Test that a file database gets the configured TimedQueuePool"""
+        with mock.patch.object(db_storage, "pool_size", 2), \
+                mock.patch.object(db_storage, "max_overflow", 0), \
+                mock.patch.object(db_storage, "pool_timeout", 0.05):
+            engine = db_storage.engine(self.url)
+        self.addCleanup(engine.dispose)
+        pool = engine.pool
+        self.assertIsInstance(pool, db_storage.TimedQueuePool)
+        self.assertEqual(pool.size(), 2)
+        first, second = engine.connect(), engine.connect()
+        with self.assertRaises(db_storage.exc.TimeoutError):
+            engine.connect()
+        self.assertEqual(pool.timeouts, 1)
+        self.assertEqual(pool.waits, 3)
+        self.assertGreaterEqual(pool.max_wait, 0.05)
+        first.close()
+        second.close()
+
+    def test_pool_stats(self):
+        """Test that pool_stats() reports the connections in use"""
+        with mock.patch.object(db_storage, "db_url", self.url), \
+                mock.patch.object(db_storage, "pool_size", 3):
+            storage = DBStorage()
+        engine = storage._DBStorage__engine
+        self.addCleanup(engine.dispose)
+        connection = engine.connect()
+        stats = storage.pool_stats()
+        self.assertEqual(stats["pool"], "TimedQueuePool")
+        self.assertEqual(stats["size"], 3)
+        self.assertEqual(stats["checked_out"], 1)
+        self.assertEqual(stats["overflow"], 0)
+        self.assertEqual(stats["timeouts"], 0)
+        connection.close()
+        stats = storage.pool_stats()
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertEqual(stats["checked_in"], 1)
+
+    def test_pool_stats_static(self):
+        """Test that pools other than TimedQueuePool report their class"""
+        with mock.patch.object(db_storage, "db_url", "sqlite://"):
+            storage = DBStorage()
+        self.addCleanup(storage._DBStorage__engine.dispose)
+        self.assertEqual(storage.pool_stats(), {"pool": "StaticPool"})
+
+
+@unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+class TestDBStorageCounts(unittest.TestCase):
+    """Tests for DBStorage.count_many()"""
+
+    def test_count_many(self):
+        """Test that the classes are counted by name in one query"""
+        before = models.storage.count_many()
+        self.assertEqual(sorted(before), sorted(classes))
+        models.storage.new(State(name="Vermont"))
+        models.storage.new(Amenity(name="Sauna"))
+        models.storage.save()
+        after = models.storage.count_many()
+        for name in classes:
+            added = 1 if name in ("State", "Amenity") else 0
+            self.assertEqual(after[name], before[name] + added)
+        self.assertEqual(models.storage.count(), sum(after.values()))
+
+    def test_count_many_classes(self):
+        """Test that only the classes asked for are counted"""
+        counts = models.storage.count_many([State, "City"])
+        self.assertEqual(counts, {"State": models.storage.count(State),
+                                  "City": models.storage.count(City)})
+
+    def test_count_many_approximate(self):
+        """Test that SQLite counts exactly when asked to approximate"""
+        self.assertEqual(models.storage.count_many(approximate=True),
+                         models.storage.count_many())
+
+    def test_count_cache(self):
+        """Test that counts are reused for the TTL until a save()"""
+        with mock.patch.object(db_storage, "count_cache_ttl", 60):
+            count = models.storage.count_many(["State"])["State"]
+            session = models.storage._DBStorage__session
+            # a row the storage does not know about yet
+            session.execute(db_storage.insert(State), [{
+                "id": "count-cache", "name": "Hidden",
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()}])
+            self.assertEqual(models.storage.count_many(["State"])["State"],
+                             count)
+            models.storage.save()
+            self.assertEqual(models.storage.count_many(["State"])["State"],
+                             count + 1)
+
+
+@unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+class TestDBStorageQueries(unittest.TestCase):
+    """Tests for the paging, iteration, bulk and search queries of
+    DBStorage, against the SQLite database of HBNB_DB_URL"""
+
+    def setUp(self):
+        """Create a state with cities, and places in the first city"""
+        storage = models.storage
+        self.state = State(name="Arizona")
+        self.cities = [City(name="City {}".format(i), state_id=self.state.id)
+                       for i in range(5)]
+        self.user = User(email="host@example.com", password="pwd")
+        self.wifi = Amenity(name="Wifi")
+        self.pool = Amenity(name="Pool")
+        self.places = []
+        for i, (lat, lng) in enumerate(((33.45, -112.07), (33.50, -112.00),
+                                        (32.22, -110.97))):
+            place = Place(name="Place {}".format(i), city_id=self.cities[0].id,
+                          user_id=self.user.id, price_by_night=50 * (i + 1),
+                          latitude=lat, longitude=lng)
+            place.amenities.append(self.wifi)
+            if i:
+                place.amenities.append(self.pool)
+            self.places.append(place)
+        storage.bulk_new([self.state, *self.cities, self.user, self.wifi,
+                          self.pool, *self.places])
+
+    def search(self, **criteria):
+        """returns the ids of the places of the state matching criteria"""
+        return sorted(place.id for place in models.storage.search_places(
+            states=[self.state.id], **criteria))
+
+    def test_page(self):
+        """Test that pages walk the rows in id order after an id"""
+        ids = sorted(city.id for city in self.cities)
+        page = models.storage.page(City, 2, attr="state_id",
+                                   value=self.state.id)
+        self.assertEqual([city.id for city in page], ids[:2])
+        page = models.storage.page("City", 10, ids[1], "state_id",
+                                   self.state.id)
+        self.assertEqual([city.id for city in page], ids[2:])
+        walked, after = [], None
+        while True:
+            page = models.storage.page(State, 3, after)
+            if not page:
+                break
+            walked.extend(state.id for state in page)
+            after = page[-1].id
+        self.assertEqual(walked, sorted(state.id for state in
+                                        models.storage.all(State).values()))
+
+    def test_iter(self):
+        """Test that iter() yields every row, whatever the batch size"""
+        expected = sorted(key.split(".")[1]
+                          for key in models.storage.all(City))
+        for batch_size in (1, 2, 1000):
+            with self.subTest(batch_size=batch_size):
+                self.assertEqual(sorted(city.id for city in
+                                        models.storage.iter(City,
+                                                            batch_size)),
+                                 expected)
+        self.assertEqual(len(list(models.storage.iter("Amenity"))),
+                         models.storage.count(Amenity))
+
+    def test_bulk_upsert(self):
+        """Test that bulk_upsert() inserts new rows and updates others"""
+        count = models.storage.count(State)
+        created_at = self.state.created_at
+        models.storage.bulk_upsert([
+            {"__class__": "State", "id": self.state.id, "name": "Renamed",
+             "created_at": "2001-01-01T00:00:00.000000"},
+            {"__class__": "State", "name": "Montana"},
+            {"__class__": "State", "id": "bulk-upsert", "name": "Kansas",
+             "updated_at": "2020-05-01T10:00:00.000000"},
+            {"__class__": "City", "id": self.cities[0].id,
+             "state_id": self.state.id, "name": "Phoenix"}])
+        self.assertEqual(models.storage.count(State), count + 2)
+        state = models.storage.get(State, self.state.id)
+        self.assertEqual(state.name, "Renamed")
+        self.assertEqual(state.created_at, created_at)
+        kansas = models.storage.get(State, "bulk-upsert")
+        self.assertEqual(kansas.name, "Kansas")
+        self.assertEqual(kansas.updated_at, datetime(2020, 5, 1, 10))
+        self.assertEqual(models.storage.get(City, self.cities[0].id).name,
+                         "Phoenix")
+
+    def test_search_places(self):
+        """Test that search_places() combines its criteria"""
+        ids = [place.id for place in self.places]
+        self.assertEqual(self.search(), sorted(ids))
+        self.assertEqual(sorted(place.id for place in
+                                models.storage.search_places(
+                                    cities=[self.cities[0].id])),
+                         sorted(ids))
+        self.assertEqual(models.storage.search_places(
+            cities=[self.cities[1].id]), [])
+        self.assertEqual(self.search(amenities=[self.wifi.id, self.pool.id]),
+                         sorted(ids[1:]))
+        self.assertEqual(self.search(ranges={"price_by_night": (60, None)}),
+                         sorted(ids[1:]))
+        self.assertEqual(self.search(ranges={"price_by_night": (None, 100)}),
+                         sorted(ids[:2]))
+        self.assertEqual(self.search(near=(33.45, -112.07, 20)),
+                         sorted(ids[:2]))
+        self.assertEqual(self.search(near=(33.45, -112.07, 1)), [ids[0]])
+        self.assertEqual(self.search(bbox=(32, -111.5, 33, -110)), [ids[2]])
+        self.assertEqual(self.search(amenities=[self.pool.id],
+                                     near=(33.45, -112.07, 20)), [ids[1]])
+
+
+@unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+class TestDBStorageFullText(unittest.TestCase):
+    """Tests for the full-text index of DBStorage.search_text() when
+    several workers write to one database"""
+
+    def setUp(self):
+        """Open two storages, as two workers would, on one SQLite file"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        url = "sqlite:///" + os.path.join(directory.name, "hbnb.db")
+        self.workers = []
+        for i in range(2):
+            with mock.patch.object(db_storage, "db_url", url):
+                storage = DBStorage()
+            storage.reload()
+            self.addCleanup(storage._DBStorage__engine.dispose)
+            self.addCleanup(storage.close)
+            self.workers.append(storage)
+        state = State(name="Hawaii")
+        city = City(name="Hilo", state_id=state.id)
+        self.user = User(email="host@example.com", password="pwd")
+        self.place = Place(name="Hut", city_id=city.id,
+                           user_id=self.user.id, description="sunny hut")
+        self.workers[0].bulk_new([state, city, self.user, self.place])
+
+    def search(self, storage, query):
+        """returns the ids a worker finds for a query, in a new request"""
+        storage.close()
+        return sorted(obj.id for obj in storage.search_text(query))
+
+    def test_other_worker_writes(self):
+        """Test that a worker finds the rows another one wrote since it
+        built its index"""
+        first, second = self.workers
+        self.assertEqual(self.search(second, "sunny"), [self.place.id])
+        review = Review(place_id=self.place.id, user_id=self.user.id,
+                        text="a sunny porch")
+        first.new(review)
+        first.save()
+        self.assertEqual(self.search(first, "sunny"),
+                         sorted([self.place.id, review.id]))
+        self.assertEqual(self.search(second, "sunny"),
+                         sorted([self.place.id, review.id]))
+        first.close()
+        first.get(Review, review.id).text = "a shady porch"
+        first.save()
+        self.assertEqual(self.search(second, "sunny"), [self.place.id])
+        self.assertEqual(self.search(second, "shady"), [review.id])
+        first.close()
+        first.delete(first.get(Review, review.id))
+        first.save()
+        self.assertEqual(self.search(second, "shady"), [])
+
+    def test_own_writes_kept(self):
+        """Test that a worker's own writes update its index in place"""
+        first = self.workers[0]
+        self.assertEqual(self.search(first, "sunny"), [self.place.id])
+        index = first._DBStorage__fulltext
+        review = Review(place_id=self.place.id, user_id=self.user.id,
+                        text="sunny")
+        first.new(review)
+        first.save()
+        self.assertEqual(self.search(first, "sunny"),
+                         sorted([self.place.id, review.id]))
+        self.assertIs(first._DBStorage__fulltext, index)
+
+
+@unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+class TestDBStorageVersion(unittest.TestCase):
+    """Tests for the change stamps of DBStorage.version()"""
+
+    def assertChanged(self, before):
+        """Checks that the version of State moved on since before"""
+        tag, modified = models.storage.version(State)
+        self.assertNotEqual(tag, before[0])
+        self.assertGreater(modified, before[1])
+
+    def test_new(self):
+        """Test that inserting a row changes the version"""
+        models.storage.new(State(name="Oregon"))
+        models.storage.save()
+        before = models.storage.version(State)
+        models.storage.new(State(name="Utah"))
+        models.storage.save()
+        self.assertChanged(before)
+
+    def test_update(self):
+        """Test that updating a row changes the version, even if its
+        updated_at is left as it was"""
+        state = State(name="Texas")
+        models.storage.new(state)
+        models.storage.save()
+        before = models.storage.version(State)
+        state.name = "Idaho"
+        models.storage.save()
+        self.assertChanged(before)
+
+    def test_delete(self):
+        """Test that deleting a row changes the version and its time,
+        which no greatest updated_at would"""
+        state = State(name="Ohio")
+        models.storage.new(state)
+        models.storage.save()
+        before = models.storage.version(State)
+        models.storage.delete(state)
+        models.storage.save()
+        self.assertChanged(before)
+
+    def test_bulk_upsert(self):
+        """Test that bulk_upsert() changes the version"""
+        before = models.storage.version(State)
+        models.storage.bulk_upsert([{"__class__": "State", "name": "Iowa"}])
+        self.assertChanged(before)
+
+    def test_unchanged(self):
+        """Test that the version of a class is kept by writes to others"""
+        before = models.storage.version(City)
+        models.storage.new(State(name="Maine"))
+        models.storage.save()
+        self.assertEqual(models.storage.version(City), before)
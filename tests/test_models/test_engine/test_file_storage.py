@@ -3,7 +3,9 @@
 import unittest
 from models.base_model import BaseModel
 from models import storage
+import json
 import os
+from unittest import mock
 
 
 @unittest.skipIf(
@@ -213,3 +215,718 @@ class test_fileStorage(unittest.TestCase):
         from models.engine.file_storage import FileStorage
 
         self.assertEqual(type(storage), FileStorage)
+
+
+@unittest.skipIf(
+    os.getenv("HBNB_TYPE_STORAGE") == "db", "FileStorage test"
+)
+class test_fileStorageIndexes(unittest.TestCase):
+    """Class to test the secondary indexes of the file storage"""
+
+    def setUp(self):
+        """Set up test environment"""
+        storage._FileStorage__objects = {}
+
+    def tearDown(self):
+        """Remove storage files at end of tests"""
+        for path in ("file.json", "file.json.versions",
+                     "file.bin", "file.bin.versions"):
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+
+    def test_state_cities(self):
+        """State.cities only returns the cities of that state"""
+        from models.state import State
+        from models.city import City
+        state, other = State(name="A"), State(name="B")
+        city = City(name="a", state_id=state.id)
+        for obj in (state, other, city, City(name="b", state_id=other.id)):
+            storage.new(obj)
+        self.assertEqual(state.cities, [city])
+
+    def test_foreign_key_update(self):
+        """Assigning a foreign key moves the object between indexes"""
+        from models.place import Place
+        from models.review import Review
+        place, other = Place(), Place()
+        review = Review(place_id=place.id)
+        for obj in (place, other, review):
+            storage.new(obj)
+        review.place_id = other.id
+        self.assertEqual(place.reviews, [])
+        self.assertEqual(other.reviews, [review])
+
+    def test_delete_unindexes(self):
+        """Deleted objects disappear from the indexes"""
+        from models.city import City
+        from models.place import Place
+        city = City()
+        place = Place(city_id=city.id)
+        storage.new(city)
+        storage.new(place)
+        storage.delete(place)
+        self.assertEqual(city.places, [])
+
+    def test_reload_indexes(self):
+        """Reloaded objects are indexed"""
+        from models.user import User
+        from models.review import Review
+        user = User()
+        storage.new(user)
+        storage.new(Review(user_id=user.id))
+        storage.save()
+        storage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(len(user.reviews), 1)
+        self.assertEqual(user.places, [])
+
+    def test_all_by_class(self):
+        """all(cls) and count(cls) only see the objects of that class"""
+        from models.state import State
+        from models.amenity import Amenity
+        state = State()
+        storage.new(state)
+        storage.new(Amenity())
+        storage.new(Amenity())
+        self.assertEqual(storage.all(State),
+                         {"State." + state.id: state})
+        self.assertEqual(storage.all("State"), storage.all(State))
+        self.assertEqual(storage.count("Amenity"), 2)
+        self.assertEqual(storage.count(), 3)
+        storage.delete(state)
+        self.assertEqual(storage.all(State), {})
+        self.assertEqual(storage.count(State), 0)
+
+    def test_load_ignored(self):
+        """all() and get() accept the eager loading paths of DBStorage"""
+        from models.state import State
+        state = State()
+        storage.new(state)
+        self.assertEqual(storage.all(State, load=["cities"]),
+                         storage.all(State))
+        self.assertIs(storage.get(State, state.id, load=["cities.places"]),
+                      state)
+
+    def test_count_many(self):
+        """count_many() returns the counts of several classes at once"""
+        from models.state import State
+        from models.amenity import Amenity
+        storage.new(State())
+        storage.new(Amenity())
+        storage.new(Amenity())
+        self.assertEqual(storage.count_many([State, "Amenity", "City"]),
+                         {"State": 1, "Amenity": 2, "City": 0})
+
+    def test_save_encodes_dirty_only(self):
+        """save() only calls to_dict() on objects changed since last save"""
+        objs = [BaseModel(), BaseModel(), BaseModel()]
+        for obj in objs:
+            storage.new(obj)
+        storage.save()
+        objs[0].name = "changed"
+        with mock.patch.object(BaseModel, "to_dict", autospec=True,
+                               side_effect=BaseModel.to_dict) as to_dict:
+            storage.save()
+            self.assertEqual(to_dict.call_count, 1)
+        storage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(
+            storage.get(BaseModel, objs[0].id).to_dict(), objs[0].to_dict())
+
+    def test_close_keeps_objects(self):
+        """close() keeps the objects while the file is unchanged"""
+        new = BaseModel()
+        new.save()
+        storage.close()
+        self.assertIs(storage.get(BaseModel, new.id), new)
+
+    def test_close_reloads_changed_file(self):
+        """close() reloads a file written by another process"""
+        from models.engine.file_storage import FileStorage
+        with mock.patch.object(FileStorage, "_FileStorage__journal",
+                               False), \
+                mock.patch.object(FileStorage, "_FileStorage__format",
+                                  "json"):
+            new = BaseModel()
+            new.save()
+            with open("file.json") as f:
+                data = json.load(f)
+            data["BaseModel." + new.id]["name"] = "external"
+            with open("file.json", "w") as f:
+                json.dump(data, f)
+                f.write(" ")
+            storage.close()
+        self.assertEqual(storage.get(BaseModel, new.id).name, "external")
+
+    def test_page(self):
+        """page() walks the objects of a class in id order"""
+        from models.state import State
+        from models.city import City
+        state = State()
+        storage.new(state)
+        cities = [City(state_id=state.id) for i in range(5)]
+        for city in cities:
+            storage.new(city)
+        ids = sorted(city.id for city in cities)
+        first = storage.page(City, 3)
+        self.assertEqual([city.id for city in first], ids[:3])
+        storage.delete(first[1])
+        storage.new(City(state_id="other"))
+        rest = storage.page(City, 3, after=first[2].id, attr="state_id",
+                            value=state.id)
+        self.assertEqual([city.id for city in rest], ids[3:])
+        storage.check_consistency()
+
+    def test_iter(self):
+        """iter() yields every object of a class"""
+        from models.state import State
+        states = [State() for i in range(3)]
+        for state in states:
+            storage.new(state)
+        storage.new(BaseModel())
+        self.assertCountEqual(storage.iter(State), states)
+        self.assertEqual(list(storage.iter("City", batch_size=2)), [])
+
+    def test_search_places(self):
+        """search_places() combines the state, city and amenity indexes"""
+        from models.state import State
+        from models.city import City
+        from models.place import Place
+        state = State()
+        cities = [City(state_id=state.id), City(state_id="other")]
+        places = [Place(city_id=cities[0].id, amenity_ids=["wifi"]),
+                  Place(city_id=cities[1].id, amenity_ids=["wifi", "tv"]),
+                  Place(city_id=cities[1].id)]
+        for obj in [state] + cities + places:
+            storage.new(obj)
+        self.assertCountEqual(storage.search_places(), places)
+        self.assertEqual(storage.search_places(states=[state.id]),
+                         places[:1])
+        self.assertCountEqual(
+            storage.search_places([state.id], [cities[1].id], ["wifi"]),
+            places[:2])
+        self.assertEqual(storage.search_places(amenities=["tv", "wifi"]),
+                         places[1:2])
+        places[1].amenity_ids = ["tv"]
+        self.assertEqual(storage.search_places(amenities=["wifi"]),
+                         places[:1])
+        storage.check_consistency()
+
+    def test_search_places_geo(self):
+        """search_places() finds places in a circle or a bounding box"""
+        from models.place import Place
+        paris = Place(latitude=48.8566, longitude=2.3522)
+        versailles = Place(latitude=48.8049, longitude=2.1204)
+        london = Place(latitude=51.5074, longitude=-0.1278)
+        for place in (paris, versailles, london):
+            storage.new(place)
+        self.assertEqual(storage.search_places(near=(48.85, 2.35, 5)),
+                         [paris])
+        self.assertCountEqual(storage.search_places(near=(48.85, 2.35, 30)),
+                              [paris, versailles])
+        self.assertEqual(
+            storage.search_places(bbox=(50, -1, 52, 1)), [london])
+        paris.latitude = 51.5
+        self.assertEqual(storage.search_places(near=(48.85, 2.35, 30)),
+                         [versailles])
+        storage.check_consistency()
+
+    def test_search_places_ranges(self):
+        """search_places() filters on sorted numeric range indexes"""
+        from models.place import Place
+        places = [Place(price_by_night=price, max_guest=guests)
+                  for price, guests in ((50, 2), (100, 4), (150, 6))]
+        for place in places:
+            storage.new(place)
+        self.assertCountEqual(
+            storage.search_places(ranges={"price_by_night": (60, None)}),
+            places[1:])
+        self.assertEqual(
+            storage.search_places(ranges={"price_by_night": (None, 100),
+                                          "max_guest": (3, 4)}),
+            places[1:2])
+        places[0].max_guest = 4
+        storage.delete(places[1])
+        self.assertEqual(
+            storage.search_places(ranges={"max_guest": (4, 4)}),
+            places[:1])
+        storage.check_consistency()
+
+    def test_search_text(self):
+        """search_text() ranks places and reviews and follows changes"""
+        from models.place import Place
+        from models.review import Review
+        place = Place(description="Sunny loft by the sea")
+        review = Review(text="The sea, the sea breeze and the sea view")
+        storage.new(place)
+        self.assertEqual(storage.search_text("sea"), [place])
+        storage.new(review)
+        self.assertEqual(storage.search_text("SEA view"), [review, place])
+        self.assertEqual(storage.search_text("sea", limit=1, offset=1),
+                         [place])
+        place.description = "Quiet cabin"
+        self.assertEqual(storage.search_text("sea"), [review])
+        storage.delete(review)
+        self.assertEqual(storage.search_text("sea"), [])
+        self.assertEqual(storage.search_text("cabin"), [place])
+
+    def test_version(self):
+        """version() starts at the latest updated_at and follows changes"""
+        from models.state import State
+        old = State(name="A", updated_at="2020-01-01T00:00:00.000000")
+        new = State(name="B", updated_at="2021-01-01T00:00:00.000000")
+        storage.new(old)
+        storage.new(new)
+        storage.save()
+        # files that no save() recorded versions in
+        os.remove(storage._FileStorage__path() + ".versions")
+        storage.reload()
+        tag, modified = storage.version(State)
+        self.assertEqual(modified, new.updated_at)
+        self.assertEqual(storage.version("State"), (tag, modified))
+        self.assertEqual(storage.version("City")[1], None)
+        old = storage.get(State, old.id)
+        old.name = "C"
+        changed, modified = storage.version(State)
+        self.assertNotEqual(changed, tag)
+        self.assertGreater(modified, new.updated_at)
+        storage.delete(old)
+        self.assertNotEqual(storage.version(State)[0], changed)
+        storage.save()
+        storage.reload()
+        self.assertNotEqual(storage.version(State)[0], tag)
+
+    def test_version_persisted(self):
+        """version() survives a reload, so equal files give equal tags
+        and a delete moves the time even after a reload"""
+        from models.state import State
+        old = State(name="A", updated_at="2020-01-01T00:00:00.000000")
+        new = State(name="B", updated_at="2021-01-01T00:00:00.000000")
+        storage.new(old)
+        storage.new(new)
+        storage.save()
+        version = storage.version(State)
+        storage.reload()
+        self.assertEqual(storage.version(State), version)
+        storage.delete(storage.get(State, new.id))
+        storage.save()
+        deleted = storage.version(State)
+        self.assertNotEqual(deleted[0], version[0])
+        storage.reload()
+        self.assertEqual(storage.version(State), deleted)
+        self.assertGreater(deleted[1], new.updated_at)
+        self.assertEqual([state.id for state in
+                          storage.all(State).values()], [old.id])
+
+    def test_subscribe(self):
+        """subscribe() listeners hear of writes and of their parents"""
+        from models.city import City
+        written = []
+        with mock.patch.object(type(storage), "_FileStorage__listeners",
+                               []):
+            storage.subscribe(lambda *args: written.append(args))
+            city = City(state_id="1")
+            storage.new(city)
+            city.state_id = "2"
+            storage.delete(city)
+            storage.reload()
+        self.assertEqual(written, [
+            ("City", city.id, [("state_id", "1")]),
+            ("City", city.id, [("state_id", "2"), ("state_id", "1")]),
+            ("City", city.id, [("state_id", "2")]),
+            (None, None, [])])
+
+    def test_bulk_new(self):
+        """bulk_new() adds every object and writes the file once"""
+        from models.state import State
+        states = [State(name=str(i)) for i in range(3)]
+        with mock.patch.object(storage, "save",
+                               wraps=storage.save) as save:
+            storage.bulk_new(states)
+            self.assertEqual(save.call_count, 1)
+        storage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(State), 3)
+
+    def test_bulk_upsert(self):
+        """bulk_upsert() updates known ids and creates the others"""
+        from models.state import State
+        from models.city import City
+        state = State(name="CA")
+        storage.new(state)
+        storage.bulk_upsert([
+            {"__class__": "State", "id": state.id, "name": "California",
+             "updated_at": "2020-01-01T00:00:00.000000"},
+            {"__class__": "City", "state_id": state.id, "name": "SF"}])
+        self.assertEqual(storage.get(State, state.id).name, "California")
+        self.assertEqual(state.updated_at.year, 2020)
+        self.assertEqual([city.name for city in state.cities], ["SF"])
+        storage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(), 2)
+
+
+@unittest.skipIf(
+    os.getenv("HBNB_TYPE_STORAGE") == "db", "FileStorage test"
+)
+class test_fileStorageJournal(unittest.TestCase):
+    """Class to test the journal mode of the file storage"""
+
+    def setUp(self):
+        """Set up test environment"""
+        from models.engine.file_storage import FileStorage
+        storage._FileStorage__objects = {}
+        for attr, value in (("_FileStorage__journal", True),
+                            ("_FileStorage__format", "json")):
+            patcher = mock.patch.object(FileStorage, attr, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Remove storage files at end of tests"""
+        for path in ("file.json", "file.json.journal",
+                     "file.json.versions"):
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+
+    def test_save_appends(self):
+        """Saves after the first snapshot only append to the journal"""
+        first = BaseModel()
+        first.save()
+        size = os.path.getsize("file.json")
+        second = BaseModel()
+        second.save()
+        self.assertEqual(os.path.getsize("file.json"), size)
+        with open("file.json.journal") as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+    def test_reload_replays(self):
+        """Reload applies the journal over the snapshot"""
+        first, second = BaseModel(), BaseModel()
+        first.save()
+        second.save()
+        first.name = "renamed"
+        storage.delete(second)
+        storage.save()
+        storage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(list(storage.all()), ["BaseModel." + first.id])
+        self.assertEqual(storage.all()["BaseModel." + first.id].name,
+                         "renamed")
+
+    def test_torn_entry_ignored(self):
+        """A partially written journal line is skipped on reload"""
+        first, second = BaseModel(), BaseModel()
+        first.save()
+        second.save()
+        with open("file.json.journal", "a") as f:
+            f.write('{"op": "delete", "ke')
+        storage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(), 2)
+
+    def test_append_after_torn_entry(self):
+        """An entry saved after a torn line survives the next reload"""
+        first, second = BaseModel(), BaseModel()
+        first.save()
+        second.save()
+        with open("file.json.journal", "a") as f:
+            f.write('{"op": "delete", "ke')
+        # reloads the journal another process tore, then appends to it
+        storage.close()
+        third = BaseModel()
+        third.save()
+        storage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(), 3)
+        self.assertIn("BaseModel." + third.id, storage.all())
+
+    def test_compaction(self):
+        """The journal is folded into the snapshot once it is long enough"""
+        from models.engine.file_storage import FileStorage
+        with mock.patch.object(FileStorage, "_FileStorage__compact_after",
+                               2):
+            BaseModel().save()
+            BaseModel().save()
+            self.assertTrue(os.path.exists("file.json.journal"))
+            BaseModel().save()
+            self.assertFalse(os.path.exists("file.json.journal"))
+        storage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(), 3)
+
+
+@unittest.skipIf(
+    os.getenv("HBNB_TYPE_STORAGE") == "db", "FileStorage test"
+)
+class test_fileStorageDurability(unittest.TestCase):
+    """Class to test the snapshot writes and fsync policy"""
+
+    def setUp(self):
+        """Set up test environment, writing JSON snapshots only"""
+        from models.engine.file_storage import FileStorage
+        storage._FileStorage__objects = {}
+        for attr, value in (("_FileStorage__journal", False),
+                            ("_FileStorage__format", "json")):
+            patcher = mock.patch.object(FileStorage, attr, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Remove storage files at end of tests"""
+        for path in ("file.json", "file.json.tmp", "file.json.versions"):
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+
+    def test_failed_write_keeps_snapshot(self):
+        """A crash before the rename leaves the previous file intact"""
+        BaseModel().save()
+        with open("file.json") as f:
+            before = f.read()
+        with mock.patch("models.engine.file_storage.os.replace",
+                        side_effect=OSError):
+            with self.assertRaises(OSError):
+                BaseModel().save()
+        with open("file.json") as f:
+            self.assertEqual(f.read(), before)
+
+    def test_fsync_always(self):
+        """The "always" policy fsyncs every save"""
+        from models.engine.file_storage import FileStorage
+        with mock.patch.object(FileStorage, "_FileStorage__fsync", "always"):
+            with mock.patch("models.engine.file_storage.os.fsync") as fs:
+                BaseModel().save()
+                self.assertTrue(fs.called)
+
+    def test_fsync_never(self):
+        """The "never" policy does not fsync"""
+        from models.engine.file_storage import FileStorage
+        with mock.patch.object(FileStorage, "_FileStorage__fsync", "never"):
+            with mock.patch("models.engine.file_storage.os.fsync") as fs:
+                BaseModel().save()
+                self.assertFalse(fs.called)
+
+    def test_group_commit(self):
+        """Saves inside the interval are fsynced together later"""
+        from models.engine.file_storage import FileStorage
+        with mock.patch.object(FileStorage, "_FileStorage__fsync", "60000"), \
+                mock.patch("models.engine.file_storage.threading.Timer") as t:
+            with mock.patch("models.engine.file_storage.os.fsync") as fs:
+                BaseModel().save()
+                BaseModel().save()
+                self.assertEqual(fs.call_count, 1)
+            self.assertEqual(t.call_count, 1)
+            FileStorage._FileStorage__sync_timer = None
+
+
+@unittest.skipIf(
+    os.getenv("HBNB_TYPE_STORAGE") == "db", "FileStorage test"
+)
+class test_fileStorageLazy(unittest.TestCase):
+    """Class to test the lazy reload mode of the file storage"""
+
+    def setUp(self):
+        """Save a state with two cities and reload them lazily"""
+        from models.engine.file_storage import FileStorage
+        from models.state import State
+        from models.city import City
+        storage._FileStorage__objects = {}
+        self.state = State(name="California")
+        storage.new(self.state)
+        for name in ("Fremont", "Napa"):
+            storage.new(City(name=name, state_id=self.state.id))
+        storage.save()
+        patcher = mock.patch.object(FileStorage, "_FileStorage__lazy", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        storage._FileStorage__objects = {}
+        storage.reload()
+
+    def tearDown(self):
+        """Remove storage file at end of tests"""
+        try:
+            os.remove("file.json")
+        except Exception:
+            pass
+
+    def test_nothing_built(self):
+        """reload() only indexes the records"""
+        self.assertEqual(storage._FileStorage__store, {})
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(storage.count("City"), 2)
+
+    def test_get_builds_one(self):
+        """get() builds only the requested object"""
+        from models.state import State
+        state = storage.get(State, self.state.id)
+        self.assertEqual(state.name, "California")
+        self.assertIs(storage.get(State, self.state.id), state)
+        self.assertEqual(len(storage._FileStorage__store), 1)
+
+    def test_relationship_builds(self):
+        """Relationship properties build the related objects"""
+        from models.state import State
+        state = storage.get(State, self.state.id)
+        self.assertEqual(sorted(city.name for city in state.cities),
+                         ["Fremont", "Napa"])
+
+    def test_threads_build_once(self):
+        """Threads building the same records all get the same objects"""
+        import threading
+        from models.state import State
+        for i in range(5000):
+            storage.new(State(name=str(i)))
+        storage.save()
+        storage._FileStorage__objects = {}
+        storage.reload()
+        results, errors = [], []
+
+        def read():
+            """builds every state, as a request would"""
+            try:
+                results.append(storage.all(State))
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=read) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results[0]), 5001)
+        for objs in results:
+            self.assertEqual(objs, results[0])
+        storage.check_consistency()
+
+    def test_save_keeps_raw(self):
+        """Records that were never built are still saved"""
+        storage.save()
+        storage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(len(storage.all()), 3)
+
+
+@unittest.skipIf(
+    os.getenv("HBNB_TYPE_STORAGE") == "db", "FileStorage test"
+)
+class test_fileStorageBinary(unittest.TestCase):
+    """Class to test the binary record file format"""
+
+    def setUp(self):
+        """Switch the storage to the binary format"""
+        from models.engine.file_storage import FileStorage
+        storage._FileStorage__objects = {}
+        patcher = mock.patch.object(FileStorage, "_FileStorage__format",
+                                    "binary")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Remove storage files at end of tests"""
+        for path in ("file.bin", "file.bin.journal", "file.bin.versions",
+                     "file.json"):
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+
+    def test_round_trip(self):
+        """Objects saved to the record file are decoded on access"""
+        from models.place import Place
+        from models.review import Review
+        place = Place(name="Loft")
+        review = Review(place_id=place.id, text="Great")
+        storage.new(place)
+        storage.new(review)
+        storage.save()
+        self.assertTrue(os.path.exists("file.bin"))
+        self.assertFalse(os.path.exists("file.json"))
+        storage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage._FileStorage__store, {})
+        self.assertEqual(storage.count("Review"), 1)
+        loaded = storage.get(Place, place.id)
+        self.assertEqual(loaded.to_dict(), place.to_dict())
+        self.assertEqual([r.text for r in loaded.reviews], ["Great"])
+
+    def test_save_copies_raw_records(self):
+        """Records never decoded are copied as-is into the next snapshot"""
+        first, second = BaseModel(), BaseModel()
+        storage.new(first)
+        storage.new(second)
+        storage.save()
+        storage._FileStorage__objects = {}
+        storage.reload()
+        storage.get(BaseModel, first.id).name = "changed"
+        storage.save()
+        storage.save()
+        storage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.get(BaseModel, first.id).name, "changed")
+        self.assertEqual(storage.get(BaseModel, second.id).to_dict(),
+                         second.to_dict())
+
+    def test_not_a_record_file(self):
+        """A file without the magic number is rejected"""
+        from models.engine import record_file
+        with open("file.bin", "wb") as f:
+            f.write(b"{}" * 8)
+        with self.assertRaises(ValueError):
+            record_file.load("file.bin")
+
+
+@unittest.skipIf(
+    os.getenv("HBNB_TYPE_STORAGE") == "db", "FileStorage test"
+)
+class test_fileStorageConsistency(unittest.TestCase):
+    """Class to test the maintained counts against the stored objects"""
+
+    def setUp(self):
+        """Check the storage after every change"""
+        from models.engine.file_storage import FileStorage
+        storage._FileStorage__objects = {}
+        patcher = mock.patch.object(FileStorage, "_FileStorage__check", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Remove storage file at end of tests"""
+        try:
+            os.remove("file.json")
+        except Exception:
+            pass
+
+    def test_counts_follow_changes(self):
+        """Counts stay exact through new, delete, updates and reloads"""
+        from models.engine.file_storage import FileStorage
+        from models.city import City
+        from models.state import State
+        state = State()
+        cities = [City(state_id=state.id) for i in range(3)]
+        for obj in [state] + cities:
+            storage.new(obj)
+        cities[0].state_id = "other"
+        storage.delete(cities[1])
+        self.assertEqual(storage.count(City), 2)
+        storage.save()
+        with mock.patch.object(FileStorage, "_FileStorage__lazy", True):
+            storage.reload()
+        self.assertEqual(storage.count(City), 2)
+        self.assertEqual(len(storage.get(State, state.id).cities), 1)
+        storage.check_consistency()
+
+    def test_drift_detected(self):
+        """A partition out of sync with the stored objects is reported"""
+        from models.state import State
+        storage.new(State())
+        storage._FileStorage__by_class["State"].clear()
+        with self.assertRaises(AssertionError):
+            storage.check_consistency()
@@ -8,6 +8,7 @@ import inspect
 import models
 from models.place import Place
 from models.base_model import BaseModel
+import os
 import pep8
 import unittest
 
@@ -203,5 +204,88 @@ class TestPlace(unittest.TestCase):
         self.assertEqual(string, str(place))
 
 
+@unittest.skipIf(models.storage_t == 'db', "FileStorage test")
+class TestPlaceSearchAPI(unittest.TestCase):
+    """Tests for the criteria of POST /api/v1/places_search"""
+
+    def setUp(self):
+        """Empty the storage and create a test client"""
+        from api.v1.app import app
+        models.storage._FileStorage__objects = {}
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """Remove storage file at end of tests"""
+        try:
+            os.remove("file.json")
+        except Exception:
+            pass
+
+    def search(self, criteria):
+        """returns the response to a search"""
+        response = self.client.post("/api/v1/places_search", json=criteria)
+        response.get_data()
+        return response
+
+    def test_geo_criteria(self):
+        """A circle or a box on the Earth finds the places within it"""
+        place = Place(latitude=48.85, longitude=2.35)
+        models.storage.new(place)
+        near = {"lat": 48.86, "lng": 2.34, "radius_km": 5}
+        bbox = {"min_lat": 48, "min_lng": 2, "max_lat": 49, "max_lng": 3}
+        for criteria in ({"near": near}, {"bbox": bbox}):
+            with self.subTest(criteria=criteria):
+                response = self.search(criteria)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([p["id"] for p in response.json],
+                                 [place.id])
+
+    def test_invalid_geo_criteria(self):
+        """Non-finite coordinates and ones off the Earth are rejected"""
+        near = {"lat": 0, "lng": 0, "radius_km": 1}
+        bbox = {"min_lat": 0, "min_lng": 0, "max_lat": 1, "max_lng": 1}
+        for key, value in (("lat", "inf"), ("lng", "nan"),
+                           ("radius_km", "inf"), ("radius_km", -1),
+                           ("lat", 90.5), ("lng", -181)):
+            with self.subTest(near=(key, value)):
+                response = self.search({"near": dict(near, **{key: value})})
+                self.assertEqual(response.status_code, 400)
+        for key, value in (("min_lat", "-inf"), ("max_lng", "nan"),
+                           ("max_lat", 91), ("min_lng", -180.5)):
+            with self.subTest(bbox=(key, value)):
+                response = self.search({"bbox": dict(bbox, **{key: value})})
+                self.assertEqual(response.status_code, 400)
+
+    def test_invalid_ids(self):
+        """Ids that are not strings are rejected before the search"""
+        for criteria in ({"amenities": [{"a": 1}]}, {"cities": [["x"]]},
+                         {"states": [1]}, {"states": "x"}):
+            with self.subTest(criteria=criteria):
+                response = self.search(criteria)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json, {"error": "Not a JSON"})
+
+    def test_range_criteria(self):
+        """Finite bounds filter the places, others are rejected"""
+        cheap, dear = Place(price_by_night=50), Place(price_by_night=500)
+        models.storage.new(cheap)
+        models.storage.new(dear)
+        response = self.search({"price_by_night": {"min": 10, "max": 100}})
+        self.assertEqual([p["id"] for p in response.json], [cheap.id])
+        for bounds in ({"min": "nan"}, {"max": "nan"}, {"min": "-inf"},
+                       {"min": 0, "max": "inf"}):
+            with self.subTest(bounds=bounds):
+                response = self.search({"price_by_night": bounds})
+                self.assertEqual(response.status_code, 400)
+
+    def test_non_finite_position_stored(self):
+        """A place at an infinite position is stored but never found"""
+        place = Place(latitude=float("inf"), longitude=0.0)
+        models.storage.new(place)
+        response = self.search({"bbox": {"min_lat": -90, "min_lng": -180,
+                                         "max_lat": 90, "max_lng": 180}})
+        self.assertEqual(response.json, [])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -4,12 +4,16 @@ Contains the TestStateDocs classes
 """
 
 from datetime import datetime
+import gzip
 import inspect
+import json
 import models
 from models import state
 from models.base_model import BaseModel
+import os
 import pep8
 import unittest
+import zlib
 from flask import Flask
 from api.v1.views import app_views
 from unittest.mock import patch, PropertyMock
@@ -182,5 +186,332 @@ class TestStateAPI(unittest.TestCase):
             self.assertEqual(response.status_code, 404)
 
 
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class StateAPITestCase(unittest.TestCase):
+    """Base of the /api/v1/states tests: stores count states in an empty
+    file storage, empties the response cache and creates a test client"""
+    # int - number of states setUp() stores in self.states
+    count = 0
+    # bool - turn the response cache off, as it reads the streamed bodies
+    uncached = False
+
+    def setUp(self):
+        """Fill the storage and create a test client"""
+        from api.v1.app import app
+        from api.v1.views import response_cache
+        models.storage._FileStorage__objects = {}
+        self.states = [State(name="State {:03d}".format(i))
+                       for i in range(self.count)]
+        for state in self.states:
+            models.storage.new(state)
+        response_cache.invalidate(None, None, [])
+        if self.uncached:
+            cache = patch.object(response_cache, "max_bytes", 0)
+            cache.start()
+            self.addCleanup(cache.stop)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """Remove storage files at end of tests"""
+        for path in ("file.json", "file.json.versions"):
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+
+    def get(self, url, **headers):
+        """GETs url, returns the response with its body read"""
+        response = self.client.get(url, headers=headers)
+        response.get_data()
+        return response
+
+
+class TestStateAPICompression(StateAPITestCase):
+    """Tests for the compressed responses of /api/v1/states"""
+    count = 40
+    uncached = True
+
+    def compressed(self, url, encoding=None, **headers):
+        """GETs url accepting encoding, returns the response and its
+        body, read to the end"""
+        if encoding is not None:
+            headers["Accept-Encoding"] = encoding
+        response = self.get(url, **headers)
+        return response, response.get_data()
+
+    def test_negotiation(self):
+        """Test that the body is compressed with the encoding accepted"""
+        response, plain = self.compressed("/api/v1/states")
+        self.assertGreater(len(plain), 1024)
+        for encoding, accept, decompress in (
+                ("gzip", "gzip", gzip.decompress),
+                ("deflate", "deflate", zlib.decompress),
+                ("gzip", "deflate;q=0.5, gzip", gzip.decompress),
+                ("deflate", "gzip;q=0, deflate", zlib.decompress)):
+            with self.subTest(accept=accept):
+                response, body = self.compressed("/api/v1/states", accept)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.headers["Content-Encoding"],
+                                 encoding)
+                self.assertLess(len(body), len(plain))
+                self.assertEqual(decompress(body), plain)
+
+    def test_vary(self):
+        """Test that responses that could be compressed vary on
+        Accept-Encoding, whether they were or not"""
+        for accept in ("gzip", None):
+            with self.subTest(accept=accept):
+                response, body = self.compressed("/api/v1/states", accept)
+                self.assertIn("Accept-Encoding", response.vary)
+
+    def test_min_size(self):
+        """Test that a body under the minimum size is left plain"""
+        url = "/api/v1/states/" + self.states[0].id
+        response, body = self.compressed(url, "gzip")
+        self.assertLess(len(body), 1024)
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertIn("Accept-Encoding", response.vary)
+        self.assertEqual(json.loads(body)["id"], self.states[0].id)
+        with patch("api.v1.app.compress_min_size", 16):
+            response, body = self.compressed(url, "gzip")
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(body))["id"],
+                         self.states[0].id)
+
+    def test_streamed(self):
+        """Test that a streamed body is compressed chunk by chunk"""
+        with patch("api.v1.views.chunk_size", 256):
+            response = self.client.get("/api/v1/states",
+                                       headers={"Accept-Encoding": "gzip"})
+            self.assertTrue(response.is_streamed)
+            chunks = list(response.response)
+            response.close()
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertNotIn("Content-Length", response.headers)
+        body = b"".join(chunks)
+        self.assertEqual(sorted(state["id"] for state in
+                                json.loads(gzip.decompress(body))),
+                         sorted(state.id for state in self.states))
+
+    def test_weak_etag(self):
+        """Test that the ETag of a compressed body is weak, on 200 and on
+        304, and still matches"""
+        response, plain = self.compressed("/api/v1/states")
+        tag, weak = response.get_etag()
+        self.assertFalse(weak)
+        response, body = self.compressed("/api/v1/states", "gzip")
+        self.assertEqual(response.get_etag(), (tag, True))
+        etag = response.headers["ETag"]
+        response, body = self.compressed("/api/v1/states", "gzip",
+                                         **{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_etag(), (tag, True))
+        self.assertEqual(body, b"")
+        response, body = self.compressed("/api/v1/states",
+                                         **{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_identity(self):
+        """Test that the body is sent plain when no compression is
+        accepted, even when identity is refused"""
+        response, plain = self.compressed("/api/v1/states")
+        for accept in (None, "identity", "identity;q=0", "gzip;q=0"):
+            with self.subTest(accept=accept):
+                response, body = self.compressed("/api/v1/states", accept)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn("Content-Encoding", response.headers)
+                self.assertEqual(body, plain)
+                self.assertEqual(len(json.loads(body)), 40)
+
+
+class TestStateAPICache(StateAPITestCase):
+    """Tests for the invalidation of the cached /api/v1/states responses,
+    see tests/test_api/test_v1/test_cache.py for the cache itself"""
+    count = 10
+
+    def cached(self, url):
+        """GETs url, returns the response and its X-Cache header"""
+        response = self.get(url)
+        return response, response.headers.get("X-Cache")
+
+    def names(self):
+        """returns the names of the states that GET /states lists"""
+        response, status = self.cached("/api/v1/states")
+        return status, sorted(state["name"] for state in response.json)
+
+    def test_invalidated_by_writes(self):
+        """Test that a cached response is served without the view until a
+        POST, PUT or DELETE drops it"""
+        url = "/api/v1/states/" + self.states[0].id
+        with patch.object(models.storage, "iter",
+                          wraps=models.storage.iter) as view_iter:
+            self.assertEqual(self.names()[0], "MISS")
+            self.assertEqual(self.names()[0], "HIT")
+            self.assertEqual(view_iter.call_count, 1)
+        response = self.client.post("/api/v1/states", json={"name": "New"})
+        self.assertEqual(response.status_code, 201)
+        status, names = self.names()
+        self.assertEqual(status, "MISS")
+        self.assertIn("New", names)
+        self.assertEqual(self.cached(url)[1], "MISS")
+        self.assertEqual(self.cached(url)[1], "HIT")
+        response = self.client.put(url, json={"name": "Renamed"})
+        self.assertEqual(response.status_code, 200)
+        response, status = self.cached(url)
+        self.assertEqual(status, "MISS")
+        self.assertEqual(response.json["name"], "Renamed")
+        status, names = self.names()
+        self.assertEqual(status, "MISS")
+        self.assertIn("Renamed", names)
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cached(url)[0].status_code, 404)
+        status, names = self.names()
+        self.assertEqual(status, "MISS")
+        self.assertNotIn("Renamed", names)
+
+
+class TestStateAPIPaging(StateAPITestCase):
+    """Tests for the ?limit=&after= pages of /api/v1/states"""
+    count = 10
+
+    def setUp(self):
+        """Fill the storage and sort the ids of the states"""
+        super().setUp()
+        self.ids = sorted(state.id for state in self.states)
+
+    def test_link_next(self):
+        """Test that the pages follow each other through Link headers"""
+        url, pages = "/api/v1/states?limit=4", []
+        while url is not None:
+            response = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([state["id"] for state in response.json])
+            link = response.headers.get("Link")
+            if link is None:
+                url = None
+                continue
+            self.assertTrue(link.endswith('>; rel="next"'))
+            self.assertIn("after=" + pages[-1][-1], link)
+            self.assertIn("limit=4", link)
+            url = link[1:link.index(">")]
+        self.assertEqual([len(page) for page in pages], [4, 4, 2])
+        self.assertEqual(sum(pages, []), self.ids)
+
+    def test_last_page(self):
+        """Test that a page ending with the last object has no Link"""
+        response = self.get("/api/v1/states?limit=10")
+        self.assertEqual([state["id"] for state in response.json], self.ids)
+        self.assertNotIn("Link", response.headers)
+        response = self.get("/api/v1/states?limit=5&after=" + self.ids[-1])
+        self.assertEqual(response.json, [])
+        self.assertNotIn("Link", response.headers)
+
+    def test_after(self):
+        """Test that a page starts after the id given, existing or not"""
+        response = self.get("/api/v1/states?limit=3&after=" + self.ids[4])
+        self.assertEqual([state["id"] for state in response.json],
+                         self.ids[5:8])
+        response = self.get("/api/v1/states?limit=3&after=0")
+        self.assertEqual([state["id"] for state in response.json],
+                         self.ids[:3])
+
+    def test_invalid(self):
+        """Test that a bad limit or after answers 400"""
+        for query in ("limit=0", "limit=-1", "limit=abc", "limit=",
+                      "limit=1001", "limit=5&after=",
+                      "limit=5&after=" + "f" * 61):
+            with self.subTest(query=query):
+                response = self.get("/api/v1/states?" + query)
+                self.assertEqual(response.status_code, 400)
+
+
+class TestStateAPIStreaming(StateAPITestCase):
+    """Tests for the streamed JSON array of /api/v1/states"""
+    uncached = True
+
+    def chunks(self, url):
+        """GETs url in chunks of 256 bytes, returns the response and the
+        chunks of its body"""
+        with patch("api.v1.views.chunk_size", 256):
+            response = self.client.get(url)
+            self.assertTrue(response.is_streamed)
+            chunks = list(response.response)
+            response.close()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/json")
+        return response, chunks
+
+    def test_empty(self):
+        """Test that no objects stream as an empty JSON array"""
+        response, chunks = self.chunks("/api/v1/states")
+        self.assertEqual(json.loads(b"".join(chunks)), [])
+
+    def test_objects(self):
+        """Test that the chunks of many objects make one JSON array"""
+        states = [State(name="State {:03d}".format(i)) for i in range(20)]
+        for state in states:
+            models.storage.new(state)
+        response, chunks = self.chunks("/api/v1/states")
+        self.assertGreater(len(chunks), 2)
+        listed = json.loads(b"".join(chunks))
+        self.assertEqual(sorted(state["id"] for state in listed),
+                         sorted(state.id for state in states))
+        self.assertEqual(listed[0], models.storage.get(
+            State, listed[0]["id"]).to_dict())
+
+    def test_one_object(self):
+        """Test that a single object streams as a JSON array of one"""
+        state = State(name="Alone")
+        models.storage.new(state)
+        response, chunks = self.chunks("/api/v1/states")
+        self.assertEqual(json.loads(b"".join(chunks)), [state.to_dict()])
+
+
+class TestStateAPIConditional(StateAPITestCase):
+    """Tests for the conditional GETs of /api/v1/states across reloads"""
+
+    def setUp(self):
+        """Save two states with no recorded versions"""
+        super().setUp()
+        self.old = State(name="A", updated_at="2020-01-01T00:00:00.000000")
+        self.new = State(name="B", updated_at="2021-01-01T00:00:00.000000")
+        models.storage.new(self.old)
+        models.storage.new(self.new)
+        models.storage.save()
+        os.remove(models.storage._FileStorage__path() + ".versions")
+        models.storage.reload()
+
+    def listing(self, **headers):
+        """GETs /api/v1/states, returns the response with its body read"""
+        return self.get("/api/v1/states", **headers)
+
+    def test_reload_keeps_etag(self):
+        """Test that the same files give the same ETag after a reload"""
+        response = self.listing()
+        etag = response.headers["ETag"]
+        self.assertEqual(response.last_modified, self.new.updated_at.replace(
+            microsecond=0, tzinfo=response.last_modified.tzinfo))
+        models.storage.reload()
+        response = self.listing(**{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_delete_then_reload(self):
+        """Test that a delete is seen by If-Modified-Since and
+        If-None-Match after a reload"""
+        response = self.listing()
+        etag = response.headers["ETag"]
+        last_modified = response.headers["Last-Modified"]
+        response = self.client.delete("/api/v1/states/" + self.old.id)
+        self.assertEqual(response.status_code, 200)
+        models.storage.reload()
+        response = self.listing(**{"If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([state["name"] for state in response.json], ["B"])
+        response = self.listing(**{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+
+
 if __name__ == '__main__':
     unittest.main()